@@ -1,26 +1,39 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from openai import AzureOpenAI, APIError
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 import os
 from dotenv import load_dotenv
 from prompts import get_portfolio_prompt, SYSTEM_PROMPT
 import logging
 from services.linkedin_parser import LinkedInParser
-from templates.portfolio_template import generate_portfolio
-from services.resume_parser import ResumeParser
-import io
+from templates.portfolio_template import (
+    assemble_portfolio, changed_sections, generate_portfolio, image_sources, render_sections,
+    section_cache, section_digests, with_responsive_images
+)
+from services.resume_parser import parse_resume_document, PARSER_VERSION as RESUME_PARSER_VERSION
+from services.resume_document import load_resume_document
 from services.project_generator import ProjectGenerator
 from services.project_description_generator import ProjectDescriptionGenerator
-from services.github_parser import extract_username, get_projects_with_description, get_user_data
-from services.ai_resume_parser import AIResumeParser
-from fastapi.responses import HTMLResponse
+from services.github_parser import extract_username, get_projects_with_description, get_user_data, iter_project_pages
+from services.ai_resume_parser import AIResumeParser, PARSER_VERSION as AI_PARSER_VERSION
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from slugify import slugify
 import uuid
-from storage import PortfolioStorage
-import requests
-from urllib.parse import quote
+from storage import PortfolioStorage, IDENTITY
+from services.http_cache import etag_matches, make_etag, negotiate_encoding
+from services.file_streaming import mapped_file_response
+from services.asset_store import AssetStore, ASSET_NAME_PATTERN, MEDIA_TYPES
+from services.image_derivatives import render_derivatives
+from services.fetch_engine import FetchEngine
+from services.image_pool import ImagePool
+from services.worker_pools import WorkerPools, PoolSaturatedError
+from services.parse_cache import ParseCache
+from services.llm_gateway import LLMGateway
+from services.openai_client import create_client, create_async_client
+import asyncio
+import json
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,34 +52,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Azure OpenAI client
+# Initialize the application-wide Azure OpenAI clients
 try:
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-        api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-        api_version="2024-02-15-preview"
-    )
+    client = create_client()
+    async_client = create_async_client()
 except Exception as e:
     logger.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
     raise
 
-resume_parser = ResumeParser()
+# Route every LLM call through one caching, deduplicating gateway
+llm_gateway = LLMGateway(client, async_client)
 
-# Initialize project generator with OpenAI client
-project_generator = ProjectGenerator(client)
+# Initialize project generator with the LLM gateway
+project_generator = ProjectGenerator(llm_gateway)
 
 # Initialize the description generator
-description_generator = ProjectDescriptionGenerator(client)
+description_generator = ProjectDescriptionGenerator(llm_gateway)
 
 # Initialize AI Resume parser
-ai_resume_parser = AIResumeParser()
+ai_resume_parser = AIResumeParser(llm_gateway)
 
 # Initialize storage
 portfolio_storage = PortfolioStorage()
 
+# Initialize the content-addressed store for images extracted from portfolios
+asset_store = AssetStore()
+
+# Initialize cache of resume parse results
+parse_cache = ParseCache()
+
+# Initialize shared async HTTP fetcher
+fetch_engine = FetchEngine()
+
+# Initialize worker pools for blocking and CPU-heavy work
+worker_pools = WorkerPools()
+
+# Assets are named by content hash, so their bytes never change
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# How often assets no deployed page uses are deleted
+ASSET_GC_INTERVAL_SECONDS = float(os.getenv('ASSET_GC_INTERVAL_HOURS', '24')) * 3600
+
+# Deployed pages may be cached briefly, then revalidated with their ETag
+PORTFOLIO_CACHE_CONTROL = os.getenv('PORTFOLIO_CACHE_CONTROL', 'public, max-age=60, must-revalidate')
+
 # Add this near your other environment variables
 UNSPLASH_ACCESS_KEY = os.getenv('UNSPLASH_ACCESS_KEY')
 
+# Tech-related search terms for more relevant project images
+TECH_IMAGE_KEYWORDS = [
+    "programming", "coding", "software development",
+    "computer science", "technology", "web development",
+    "artificial intelligence", "data science", "cybersecurity",
+    "cloud computing", "machine learning", "software engineering"
+]
+
+# Initialize the pool of pre-fetched project images
+image_pool = ImagePool(fetch_engine, TECH_IMAGE_KEYWORDS, UNSPLASH_ACCESS_KEY)
+
+async def collect_unused_assets():
+    while True:
+        try:
+            removed = await asyncio.to_thread(asset_store.collect_garbage, portfolio_storage.iter_pages())
+            if removed:
+                logger.info(f"Removed {removed} unused assets")
+        except Exception as e:
+            logger.error(f"Asset garbage collection failed: {str(e)}")
+        await asyncio.sleep(ASSET_GC_INTERVAL_SECONDS)
+
+asset_gc_task = None
+
+@app.on_event("startup")
+async def startup():
+    global asset_gc_task
+    await fetch_engine.start()
+    image_pool.start()
+    asset_gc_task = asyncio.create_task(collect_unused_assets())
+
+@app.on_event("shutdown")
+async def shutdown():
+    asset_gc_task.cancel()
+    await image_pool.close()
+    await fetch_engine.close()
+    await async_client.close()
+    client.close()
+    worker_pools.shutdown()
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Data validation models
 class Project(BaseModel):
     title: str
@@ -85,6 +164,8 @@ class UserInfo(BaseModel):
     linkedin: str | None = None
     profile_image: str | None = None
     html_content: str | None = None
+    # Section digests from a previous render; when set, only changed sections are returned
+    known_sections: Dict[str, str] | None = None
 
 class PortfolioRequest(BaseModel):
     user: UserInfo
@@ -100,16 +181,15 @@ class GithubRequest(BaseModel):
 async def generate_portfolio_handler(request: UserInfo):
     try:
         user_data = request.dict()
-        # Add debug logs
-        print("Received user_data keys:", user_data.keys())
-        print("Profile image present:", "profile_image" in user_data)
-        if "profile_image" in user_data:
-            print("Profile image type:", type(user_data["profile_image"]))
-            print("Profile image starts with:", user_data["profile_image"][:50] if user_data["profile_image"] else "None")
-            
+        known_sections = user_data.pop("known_sections")
         logger.info("Generating portfolio...")
-        html = generate_portfolio(user_data)
-        return {"html": html}
+        sections = render_sections(user_data)
+        if known_sections is not None:
+            return {
+                "sections": section_digests(sections),
+                "fragments": changed_sections(sections, known_sections)
+            }
+        return {"html": assemble_portfolio(sections), "sections": section_digests(sections)}
     except Exception as e:
         logger.error(f"Portfolio generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -117,9 +197,13 @@ async def generate_portfolio_handler(request: UserInfo):
 @app.post("/parse-linkedin")
 async def parse_linkedin(request: LinkedInRequest):
     try:
-        parser = LinkedInParser()
-        profile_data = parser.parse_profile(request.profile_url)
+        # Logging in to LinkedIn blocks too, so build the parser in the worker
+        profile_data = await worker_pools.run_io(
+            lambda: LinkedInParser().parse_profile(request.profile_url)
+        )
         return profile_data
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"LinkedIn parsing error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -132,12 +216,18 @@ async def parse_resume(file: UploadFile = File(...)):
         
         if file_ext not in ['pdf', 'docx']:
             raise HTTPException(status_code=400, detail="Unsupported file format")
+
+        cache_key = await worker_pools.run_io(ParseCache.key, content, 'parse-resume', f"{RESUME_PARSER_VERSION}+{AI_PARSER_VERSION}")
+        cached = await worker_pools.run_io(parse_cache.get, cache_key)
+        if cached is not None:
+            return cached
         
-        # Get basic info from regular parser
-        basic_data = resume_parser.parse_pdf(io.BytesIO(content)) if file_ext == 'pdf' else resume_parser.parse_docx(io.BytesIO(content))
-        
-        # Get enhanced content from AI parser
-        ai_data = ai_resume_parser.parse_resume(io.BytesIO(content), file_ext)
+        # Decode the upload once, then run both parsers on it concurrently
+        document = await worker_pools.run_cpu(load_resume_document, content, file_ext)
+        basic_data, ai_data = await asyncio.gather(
+            worker_pools.run_cpu(parse_resume_document, document),
+            ai_resume_parser.parse_document_async(document)
+        )
         
         # Combine skills from both parsers
         all_skills = set()
@@ -156,8 +246,11 @@ async def parse_resume(file: UploadFile = File(...)):
             'interests': ai_data.get('interests', ''),
             'about_me': ai_data.get('about_me', '')
         }
-        
+
+        await worker_pools.run_io(parse_cache.set, cache_key, combined_data)
         return combined_data
+    except (HTTPException, PoolSaturatedError):
+        raise
     except Exception as e:
         logger.error(f"Resume parsing error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -170,20 +263,45 @@ async def parse_resume_ai(file: UploadFile = File(...)):
         
         if file_ext not in ['pdf', 'docx']:
             raise HTTPException(status_code=400, detail="Unsupported file format")
+
+        cache_key = await worker_pools.run_io(ParseCache.key, content, 'parse-resume-ai', AI_PARSER_VERSION)
+        cached = await worker_pools.run_io(parse_cache.get, cache_key)
+        if cached is not None:
+            return cached
             
-        data = ai_resume_parser.parse_resume(io.BytesIO(content), file_ext)
+        document = await worker_pools.run_cpu(load_resume_document, content, file_ext)
+        data = await ai_resume_parser.parse_document_async(document)
+        await worker_pools.run_io(parse_cache.set, cache_key, data)
         return data
+    except (HTTPException, PoolSaturatedError):
+        raise
     except Exception as e:
         logger.error(f"AI Resume parsing error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/parse-cache/stats")
+async def parse_cache_stats():
+    return parse_cache.stats()
+
+@app.get("/image-pool/stats")
+async def image_pool_stats():
+    return image_pool.stats()
+
+@app.get("/portfolio-sections/stats")
+async def portfolio_section_stats():
+    return section_cache.stats()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    return llm_gateway.stats()
+
 @app.post("/generate-project-description")
 async def generate_project_description(data: dict):
     try:
         if not data.get('title') or not data.get('image'):
             raise HTTPException(status_code=400, detail="Title and image are required")
 
-        description = description_generator.generate_description(
+        description = await description_generator.generate_description_async(
             title=data['title'],
             image=data['image'],
             brief_description=data.get('description', ''),
@@ -194,10 +312,55 @@ async def generate_project_description(data: dict):
             raise HTTPException(status_code=400, detail="Could not generate description")
 
         return {"description": description}
+    except (HTTPException, PoolSaturatedError):
+        raise
     except Exception as e:
         logger.error(f"Error generating project description: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate-project-description/stream")
+async def stream_project_description(data: dict):
+    if not data.get('title') or not data.get('image'):
+        raise HTTPException(status_code=400, detail="Title and image are required")
+
+    async def events():
+        # Server-Sent Events: "delta" chunks as they arrive, then one "done"
+        async for event in description_generator.stream_description(
+            title=data['title'],
+            image=data['image'],
+            brief_description=data.get('description', ''),
+            youtube_url=data.get('youtube_url')
+        ):
+            name = 'delta' if 'delta' in event else 'done'
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def to_portfolio_projects(projects, offset=0):
+    """Convert GitHub projects to portfolio format, attaching pooled Unsplash images.
+
+    ``offset`` is the position of the first project in the whole listing,
+    so keyword cycling stays stable across pages.
+    """
+    portfolio_projects = []
+    for i, project in enumerate(projects):
+        portfolio_project = {
+            "title": project["name"],
+            "description": project["description"],
+            "image": image_pool.assign(offset + i),
+            "github": project["url"],
+            "live": project.get("homepage"),
+            "demo": None,
+            "technologies": ", ".join(project.get("topics", []))
+        }
+        portfolio_projects.append(portfolio_project)
+
+    return portfolio_projects
+
 @app.post("/fetch-github-projects")
 async def fetch_github_projects(request: GithubRequest):
     try:
@@ -205,62 +368,109 @@ async def fetch_github_projects(request: GithubRequest):
         if not username:
             raise HTTPException(status_code=400, detail="Invalid GitHub URL")
 
-        # Get GitHub projects
-        projects = get_projects_with_description(username)
+        # Get GitHub projects without blocking the event loop
+        projects = await worker_pools.run_io(get_projects_with_description, username)
         if not projects:
             return {"projects": []}
 
-        # Tech-related search terms for more relevant images
-        tech_keywords = [
-            "programming", "coding", "software development",
-            "computer science", "technology", "web development",
-            "artificial intelligence", "data science", "cybersecurity",
-            "cloud computing", "machine learning", "software engineering"
-        ]
+        portfolio_projects = to_portfolio_projects(projects)
+        return {"projects": portfolio_projects}
 
-        # Transform projects into portfolio format
-        portfolio_projects = []
-        for project in projects:
-            # Get a random tech image from Unsplash
-            image_url = None
-            try:
-                # Use a random tech keyword for the search
-                search_query = tech_keywords[len(portfolio_projects) % len(tech_keywords)]
-                
-                response = requests.get(
-                    f"https://api.unsplash.com/photos/random",
-                    params={
-                        "query": search_query,
-                        "orientation": "landscape",
-                    },
-                    headers={
-                        "Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"
-                    }
-                )
-                
-                if response.ok:
-                    image_data = response.json()
-                    image_url = image_data["urls"]["regular"]
-            except Exception as e:
-                logger.error(f"Error fetching image for project {project['name']}: {str(e)}")
-
-            portfolio_project = {
-                "title": project["name"],
-                "description": project["description"],
-                "image": image_url,
-                "github": project["url"],
-                "live": project.get("homepage"),
-                "demo": None,
-                "technologies": ", ".join(project.get("topics", []))
-            }
-            portfolio_projects.append(portfolio_project)
+    except (HTTPException, PoolSaturatedError):
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching GitHub projects: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {"projects": portfolio_projects}
+@app.post("/fetch-github-projects/stream")
+async def stream_github_projects(request: GithubRequest):
+    username = extract_username(request.github_url)
+    if not username:
+        raise HTTPException(status_code=400, detail="Invalid GitHub URL")
 
+    # The generator is advanced from worker threads. The lock keeps close()
+    # from running while a next() is still in flight after a disconnect.
+    pages = iter_project_pages(username)
+    pages_lock = threading.Lock()
+
+    def next_page():
+        with pages_lock:
+            return next(pages, None)
+
+    def close_pages():
+        with pages_lock:
+            pages.close()
+
+    # Fetch the first page before responding so a saturated pool is still a
+    # 503 and a failed listing a 500, as from the batch endpoint
+    try:
+        first_page = await worker_pools.run_io(next_page)
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching GitHub projects: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def lines():
+        # Newline-delimited JSON, one project per line, page by page. A
+        # failure after the first line ends the body with an {"error": ...}
+        # line, so a truncated listing is never mistaken for a complete one.
+        projects, offset = first_page, 0
+        try:
+            while projects is not None:
+                for project in to_portfolio_projects(projects, offset):
+                    yield json.dumps(project) + "\n"
+                offset += len(projects)
+                projects = await worker_pools.run_io(next_page)
+        except Exception as e:
+            logger.error(f"Error streaming GitHub projects: {str(e)}")
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            # Not awaited: a cancelled response cannot wait, and closing
+            # may have to wait for the in-flight page
+            asyncio.get_running_loop().run_in_executor(None, close_pages)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def build_deploy_html(html_content, user_info):
+    """Use the provided HTML or render a new page, moving inline images into the asset store."""
+    if html_content:
+        return asset_store.externalize_html(html_content)
+    user_info = dict(user_info, profile_image=asset_store.externalize(user_info.get('profile_image')))
+    if user_info.get('projects'):
+        user_info['projects'] = [
+            dict(project, image=asset_store.externalize(project.get('image')))
+            for project in user_info['projects']
+        ]
+    return generate_portfolio(user_info)
+
+async def image_derivatives(name):
+    """Resized variants of an asset, generated in the CPU pool the first time they are needed."""
+    manifest = await worker_pools.run_io(asset_store.get_derivatives, name)
+    if manifest is not None:
+        return manifest
+    data = await worker_pools.run_io(asset_store.read, name)
+    rendered = await worker_pools.run_cpu(render_derivatives, data) if data else None
+    if rendered is None:
+        return None
+    return await worker_pools.run_io(asset_store.save_derivatives, name, rendered)
+
+async def add_responsive_images(html):
+    """Serve every stored image in the page through srcset variants."""
+    urls = {url: asset_store.asset_name(url) for url in set(image_sources(html))}
+    urls = {url: name for url, name in urls.items() if name}
+    results = await asyncio.gather(*(image_derivatives(name) for name in urls.values()), return_exceptions=True)
+
+    manifests = {}
+    for url, result in zip(urls, results):
+        if isinstance(result, PoolSaturatedError):
+            raise result
+        if isinstance(result, Exception):
+            logger.error(f"Error generating variants for {url}: {str(result)}")
+        elif result:
+            manifests[url] = result
+    return with_responsive_images(html, manifests)
+
 @app.post("/deploy-portfolio")
 async def deploy_portfolio(request: dict):
     try:
@@ -268,15 +478,15 @@ async def deploy_portfolio(request: dict):
         html_content = request.get('html_content')
         user_info = {k: v for k, v in request.items() if k != 'html_content'}
         
-        # Use provided HTML content if available, otherwise generate new
-        html = html_content if html_content else generate_portfolio(user_info)
-        
-        # Create a unique slug from the name
-        base_slug = slugify(request['name'], allow_unicode=False)
+        # Create a unique slug from the name, which may slugify to nothing
+        # when it has no Latin letters or digits
+        base_slug = slugify(request['name'], allow_unicode=False) or "portfolio"
         slug = f"{base_slug}-{str(uuid.uuid4())[:8]}"
         
-        # Save the portfolio
-        portfolio_storage.save_portfolio(slug, {
+        # Build and save the portfolio; decoding images and compressing are too slow for the event loop
+        html = await worker_pools.run_io(build_deploy_html, html_content, user_info)
+        html = await add_responsive_images(html)
+        await worker_pools.run_io(portfolio_storage.save_portfolio, slug, {
             "html_content": html
         })
         
@@ -288,16 +498,75 @@ async def deploy_portfolio(request: dict):
             "url": portfolio_url,
             "slug": slug
         }
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"Portfolio deployment failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/portfolio/{slug}")
-async def get_portfolio(slug: str):
-    html_content = portfolio_storage.get_portfolio(slug)
-    if not html_content:
+async def get_portfolio(slug: str, request: Request):
+    # Hot pages are served straight from memory; misses read disk in a worker
+    portfolio = portfolio_storage.get_cached(slug)
+    if portfolio is None:
+        portfolio = await worker_pools.run_io(portfolio_storage.get_stored, slug)
+    if portfolio is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    return HTMLResponse(content=html_content, status_code=200)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), portfolio.files)
+    headers = {
+        "ETag": make_etag(portfolio.digest, encoding),
+        "Cache-Control": PORTFOLIO_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), portfolio.digest):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    if portfolio.streamed:
+        # Large pages stay on disk; a Range only applies if If-Range still matches
+        if_range = request.headers.get("if-range")
+        range_header = request.headers.get("range") if not if_range or etag_matches(if_range, portfolio.digest) else None
+        try:
+            return mapped_file_response(portfolio.files[encoding or IDENTITY], headers, range_header)
+        except FileNotFoundError:
+            # Replaced by a redeploy since it was cached; serve the new version
+            portfolio_storage.invalidate(slug)
+            return await get_portfolio(slug, request)
+
+    return HTMLResponse(content=portfolio.bodies[encoding or IDENTITY], status_code=200, headers=headers)
+
+@app.post("/assets")
+async def upload_asset(file: UploadFile = File(...)):
+    try:
+        content = await file.read()
+        name = await worker_pools.run_io(asset_store.put, content)
+        if not name:
+            raise HTTPException(status_code=400, detail="Unsupported or oversized image")
+        return {"name": name, "url": asset_store.url_for(name)}
+    except (HTTPException, PoolSaturatedError):
+        raise
+    except Exception as e:
+        logger.error(f"Asset upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/assets/{name}")
+async def get_asset(name: str, request: Request):
+    path = asset_store.path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+
+    digest, extension = ASSET_NAME_PATTERN.match(name).groups()
+    headers = {
+        "ETag": make_etag(digest),
+        "Cache-Control": ASSET_CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff",
+    }
+    if etag_matches(request.headers.get("if-none-match"), digest):
+        return Response(status_code=304, headers=headers)
+    return mapped_file_response(path, headers, request.headers.get("range"), MEDIA_TYPES[extension])
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,132 @@
+"""Portfolio render micro-benchmark.
+
+Compares the compiled templates against the previous approach, which ran
+``str.format`` over the page and built fragments with f-strings. The
+compiled templates are measured on their own (``generate_portfolio``, as a
+deploy renders), then through the section cache, both cold (every
+fragment rendered) and warm (the edit-preview case).
+
+Run from the backend directory:
+
+    python -m benchmarks.render_benchmark --projects 12 --repeat 2000
+"""
+import argparse
+import json
+import time
+
+from templates.portfolio_template import (
+    PORTFOLIO_TEMPLATE, SECTION_TEMPLATES, assemble_portfolio, generate_portfolio, render_sections, section_cache
+)
+
+
+def legacy_render(user_info):
+    skills_html = '\n'.join([
+        f'''
+        <div class="skill-card">
+            <div class="skill-info">
+                <h3>{skill.strip()}</h3>
+            </div>
+        </div>
+        ''' for skill in user_info['skills'].split(',')
+    ])
+    projects_html = '\n'.join([
+        f'''
+            <div class="project-card">
+                <div class="project-image-container">
+                    <img src="{project['image']}" alt="{project['title']}" class="project-image">
+                </div>
+                <div class="project-info">
+                    <h3>{project['title']}</h3>
+                    <p class="project-description">{project['description']}</p>
+                    {f'<p class="project-technologies">Technologies: {project["technologies"]}</p>' if project.get("technologies") else ''}
+                    <div class="project-links">
+                        {f'<a href="{project["github"]}" class="project-link" target="_blank"><i class="fab fa-github"></i> GitHub</a>' if project.get('github') else ''}
+                        {f'<a href="{project["live"]}" class="project-link" target="_blank"><i class="fas fa-external-link-alt"></i> Live</a>' if project.get('live') else ''}
+                    </div>
+                </div>
+            </div>
+            ''' for project in user_info['projects']
+    ])
+    profile_image_html = f'<img src="{user_info["profile_image"]}" alt="Profile" style="width: 100%; height: 100%; object-fit: cover;">'
+    name = user_info['name']
+    return PORTFOLIO_TEMPLATE.format(
+        title_html=SECTION_TEMPLATES['title'].format(name=name),
+        header_html=SECTION_TEMPLATES['header'].format(name=name),
+        about_html=SECTION_TEMPLATES['about'].format(
+            about_me=f"Hello my name is {name}! I am {user_info['about_me']}",
+            profile_image_html=profile_image_html
+        ),
+        skills_html=SECTION_TEMPLATES['skills'].format(skills_html=skills_html),
+        projects_html=SECTION_TEMPLATES['projects'].format(projects_html=projects_html),
+        contact_html=SECTION_TEMPLATES['contact'].format(
+            email=user_info['email'], github=user_info['github'], linkedin=user_info['linkedin']
+        ),
+        footer_html=SECTION_TEMPLATES['footer'].format(name=name)
+    )
+
+
+def cold_render(user_info):
+    section_cache.clear()
+    return assemble_portfolio(render_sections(user_info))
+
+
+def warm_render(user_info):
+    return assemble_portfolio(render_sections(user_info))
+
+
+def request_copies(user_info, count):
+    """Copies of the user with new string objects, as each request body decodes to."""
+    body = json.dumps(user_info)
+    return [json.loads(body) for _ in range(count)]
+
+
+def measure(render, user_info, repeat):
+    """Best time per render over three rounds, each over fresh request copies."""
+    best = float('inf')
+    for _ in range(3):
+        copies = request_copies(user_info, repeat)
+        started = time.perf_counter()
+        for copy in copies:
+            render(copy)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def sample_user(project_count, image_kb):
+    return {
+        'name': 'Ada Lovelace',
+        'about_me': 'a software engineer who enjoys building analytical engines.',
+        'skills': ', '.join(['Python', 'FastAPI', 'React', 'Docker', 'Kubernetes', 'PostgreSQL', 'AWS', 'Git']),
+        'email': 'ada@example.com',
+        'github': 'https://github.com/ada',
+        'linkedin': 'https://linkedin.com/in/ada',
+        'profile_image': 'data:image/jpeg;base64,' + 'A' * image_kb * 1024,
+        'projects': [
+            {
+                'title': f'Project {i}',
+                'description': 'A description of what the project does and why it matters. ' * 3,
+                'image': f'https://images.example.com/{i}.jpg',
+                'github': f'https://github.com/ada/project-{i}',
+                'live': f'https://project-{i}.example.com',
+                'technologies': 'Python, FastAPI, React',
+            }
+            for i in range(project_count)
+        ],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark portfolio rendering")
+    parser.add_argument('--projects', type=int, default=12)
+    parser.add_argument('--image-kb', type=int, default=0, help="Size of the inline profile image")
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    user = sample_user(args.projects, args.image_kb)
+    renderers = (
+        ('str.format', legacy_render), ('compiled', generate_portfolio), ('cold', cold_render), ('warm', warm_render)
+    )
+    for label, render in renderers:
+        seconds = measure(render, user, args.repeat)
+        print(f"{label:>10}: {seconds / args.repeat * 1e6:8.1f} us/render  "
+              f"({args.repeat / seconds:,.0f} renders/s)")
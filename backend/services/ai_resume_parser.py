@@ -1,39 +1,18 @@
-from openai import AzureOpenAI
-import os
-from dotenv import load_dotenv
+import asyncio
 import logging
-from typing import Dict
-import PyPDF2
-import docx
+from typing import Dict, List
 import re
+from services.resume_document import ResumeDocument
+from services.llm_gateway import LLMGateway
 
 logger = logging.getLogger(__name__)
 
+# Bump when the prompt or output format changes, to invalidate cached results
+PARSER_VERSION = '1'
+
 class AIResumeParser:
-    def __init__(self):
-        load_dotenv()
-        self.client = AzureOpenAI(
-            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-            api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-            api_version="2024-02-15-preview"
-        )
-
-    def _extract_text(self, file_content: bytes, file_type: str) -> str:
-        """Extract text from PDF or DOCX file."""
-        try:
-            if file_type == 'pdf':
-                pdf_reader = PyPDF2.PdfReader(file_content)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
-            elif file_type == 'docx':
-                doc = docx.Document(file_content)
-                text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                return text
-        except Exception as e:
-            logger.error(f"Error extracting text from {file_type}: {str(e)}")
-            raise
+    def __init__(self, gateway: LLMGateway):
+        self.gateway = gateway
 
     def _preprocess_text(self, text: str) -> str:
         """Preprocess and summarize resume text to reduce tokens."""
@@ -60,8 +39,7 @@ class AIResumeParser:
         summarized_text = ' '.join(extracted_text)[:800]
         return summarized_text
 
-    def _analyze_with_ai(self, text: str) -> Dict:
-        """Use Azure OpenAI to analyze the resume text."""
+    def _build_messages(self, text: str) -> List[Dict]:
         # Preprocess and summarize text
         summarized_text = self._preprocess_text(text)
         
@@ -80,48 +58,77 @@ INTERESTS: <interests list>
 LINKEDIN: <URL or 'Not found'>
 ABOUT_ME: <summary>"""
 
+        return [
+            {"role": "system", "content": "You are a resume analyzer. Be brief and precise."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_response(self, content: str) -> Dict:
+        # Extract sections using regex
+        skills_match = re.search(r'SKILLS: (.*?)(?=\n|$)', content)
+        interests_match = re.search(r'INTERESTS: (.*?)(?=\n|$)', content)
+        linkedin_match = re.search(r'LINKEDIN: (.*?)(?=\n|$)', content)
+        about_match = re.search(r'ABOUT_ME: (.*?)(?=\n|$)', content)
+        
+        return {
+            'skills': skills_match.group(1).strip() if skills_match else '',
+            'interests': interests_match.group(1).strip() if interests_match else '',
+            'linkedin': linkedin_match.group(1).strip() if linkedin_match and 'not found' not in linkedin_match.group(1).lower() else '',
+            'about_me': about_match.group(1).strip() if about_match else ''
+        }
+
+    def _analyze_with_ai(self, text: str) -> Dict:
+        """Use Azure OpenAI to analyze the resume text."""
         try:
-            response = self.client.chat.completions.create(
-                model=os.getenv('AZURE_OPENAI_MODEL'),
-                messages=[
-                    {"role": "system", "content": "You are a resume analyzer. Be brief and precise."},
-                    {"role": "user", "content": prompt}
-                ],
+            content = self.gateway.complete(
+                'ai_resume_parser',
+                messages=self._build_messages(text),
                 temperature=0.7,
                 max_tokens=300  # Further limit response length
             )
-            
-            # Parse the response
-            content = response.choices[0].message.content
-            
-            # Extract sections using regex
-            skills_match = re.search(r'SKILLS: (.*?)(?=\n|$)', content)
-            interests_match = re.search(r'INTERESTS: (.*?)(?=\n|$)', content)
-            linkedin_match = re.search(r'LINKEDIN: (.*?)(?=\n|$)', content)
-            about_match = re.search(r'ABOUT_ME: (.*?)(?=\n|$)', content)
-            
-            return {
-                'skills': skills_match.group(1).strip() if skills_match else '',
-                'interests': interests_match.group(1).strip() if interests_match else '',
-                'linkedin': linkedin_match.group(1).strip() if linkedin_match and 'not found' not in linkedin_match.group(1).lower() else '',
-                'about_me': about_match.group(1).strip() if about_match else ''
-            }
+            return self._parse_response(content)
 
         except Exception as e:
             logger.error(f"Error analyzing resume with AI: {str(e)}")
             raise
 
-    def parse_resume(self, file_content: bytes, file_type: str) -> Dict:
-        """Main method to parse resume and extract information using AI."""
+    async def _analyze_with_ai_async(self, text: str) -> Dict:
+        """Async version of ``_analyze_with_ai``."""
+        try:
+            content = await self.gateway.acomplete(
+                'ai_resume_parser',
+                messages=self._build_messages(text),
+                temperature=0.7,
+                max_tokens=300  # Further limit response length
+            )
+            return self._parse_response(content)
+
+        except Exception as e:
+            logger.error(f"Error analyzing resume with AI: {str(e)}")
+            raise
+
+    def parse_document(self, document: ResumeDocument) -> Dict:
+        """Analyze an already decoded resume with AI."""
         try:
-            # First extract text from the file
-            text = self._extract_text(file_content, file_type)
-            
-            # Then analyze with AI
-            parsed_data = self._analyze_with_ai(text)
-            
-            return parsed_data
+            return self._analyze_with_ai(document.clean_text)
+        except Exception as e:
+            logger.error(f"Error parsing resume: {str(e)}")
+            raise
 
+    async def parse_document_async(self, document: ResumeDocument) -> Dict:
+        """Async version of ``parse_document``."""
+        try:
+            return await self._analyze_with_ai_async(document.clean_text)
         except Exception as e:
             logger.error(f"Error parsing resume: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def parse_resume(self, file_content: bytes, file_type: str) -> Dict:
+        """Main method to parse resume and extract information using AI."""
+        return self.parse_document(ResumeDocument(file_content, file_type))
+
+    async def parse_resume_async(self, file_content: bytes, file_type: str) -> Dict:
+        """Async version of ``parse_resume``."""
+        # Text extraction is CPU-bound, so decode off the event loop
+        document = await asyncio.to_thread(ResumeDocument(file_content, file_type).load)
+        return await self.parse_document_async(document)
@@ -0,0 +1,246 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+from urllib.parse import urlparse
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Raster formats only: SVG can carry script and is never stored
+FORMAT_EXTENSIONS = {'PNG': 'png', 'JPEG': 'jpg', 'GIF': 'gif', 'WEBP': 'webp'}
+MEDIA_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg', 'gif': 'image/gif', 'webp': 'image/webp'}
+
+ASSET_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})\.(png|jpg|gif|webp)$')
+DATA_URI_PATTERN = re.compile(r'data:image/[a-zA-Z0-9.+-]+;base64,([A-Za-z0-9+/=]+)')
+# An asset name anywhere in a page or manifest, whatever host or prefix its URL has
+ASSET_REFERENCE_PATTERN = re.compile(rb'(?<![0-9a-f])([0-9a-f]{64}\.(?:png|jpg|gif|webp))(?![0-9A-Za-z])')
+
+
+class AssetStore:
+    """Content-addressed store for images pulled out of portfolio pages.
+
+    An asset is named by the SHA-256 of its bytes and lives at
+    ``assets/<hash[:2]>/<hash>.<ext>``. The same image used by many
+    portfolios is stored once. A name always refers to the same bytes, so
+    assets can be cached by browsers and CDNs forever.
+
+    Assets are never deleted when a page stops using them, since other
+    pages may share them. ``collect_garbage`` removes the ones no deployed
+    page references any more.
+    """
+
+    def __init__(self, root: Optional[str] = None, public_base_url: Optional[str] = None,
+                 max_bytes: Optional[int] = None):
+        self.root = Path(root or os.getenv('ASSET_DIR', 'assets'))
+        self.root.mkdir(exist_ok=True)
+        base_url = public_base_url if public_base_url is not None else os.getenv('PUBLIC_BASE_URL', '')
+        self.public_base_url = base_url.rstrip('/')
+        self.max_bytes = max_bytes or int(os.getenv('ASSET_MAX_MB', '10')) * 1024 * 1024
+        self.gc_grace_seconds = float(os.getenv('ASSET_GC_GRACE_HOURS', '24')) * 3600
+
+    @staticmethod
+    def sniff_extension(data: bytes) -> Optional[str]:
+        """File extension for an image's real format, or None if it is not a supported image."""
+        try:
+            return FORMAT_EXTENSIONS.get(Image.open(BytesIO(data)).format)
+        except Exception:
+            return None
+
+    def _path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    def path_for(self, name: str) -> Optional[Path]:
+        """Path of a stored asset, or None if the name is invalid or unknown."""
+        if not ASSET_NAME_PATTERN.match(name):
+            return None
+        path = self._path(name)
+        return path if path.exists() else None
+
+    def url_for(self, name: str) -> str:
+        return f"{self.public_base_url}/assets/{name}"
+
+    def put(self, data: bytes) -> Optional[str]:
+        """Store an image and return its asset name, or None if it is not an accepted image."""
+        if len(data) > self.max_bytes:
+            return None
+        extension = self.sniff_extension(data)
+        if extension is None:
+            return None
+
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self._path(name)
+        if path.exists():
+            # Restart its grace period: the caller is about to reference it
+            os.utime(path)
+            return name
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return name
+
+    def read(self, name: str) -> Optional[bytes]:
+        path = self.path_for(name)
+        return path.read_bytes() if path is not None else None
+
+    def _derivatives_path(self, name: str) -> Path:
+        return self.root / name[:2] / f"{name.split('.')[0]}.variants.json"
+
+    def get_derivatives(self, name: str) -> Optional[Dict]:
+        """Manifest of an asset's resized variants, if they were generated before."""
+        if not ASSET_NAME_PATTERN.match(name):
+            return None
+        try:
+            with open(self._derivatives_path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading derivatives of {name}: {str(e)}")
+            return None
+
+    def save_derivatives(self, name: str, rendered: Dict) -> Dict:
+        """Store the output of ``render_derivatives`` as assets and record their URLs.
+
+        The manifest lists WebP variants as ``[width, url]`` pairs, smallest
+        first, plus the JPEG fallback and its intrinsic size.
+        """
+        manifest = {
+            'width': rendered['width'],
+            'height': rendered['height'],
+            'webp': [
+                [width, self.url_for(self.put(data))]
+                for width, data in sorted(rendered['webp'].items())
+            ],
+            'fallback': self.url_for(self.put(rendered['jpeg'])),
+        }
+        path = self._derivatives_path(name)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return manifest
+
+    def store_data_uri(self, uri: str) -> Optional[str]:
+        """Store the image in a base64 data URI and return its URL, or None if it cannot be stored."""
+        match = DATA_URI_PATTERN.fullmatch(uri.strip())
+        if not match:
+            return None
+        try:
+            data = base64.b64decode(match.group(1), validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        name = self.put(data)
+        return self.url_for(name) if name else None
+
+    def externalize(self, value: Optional[str]) -> Optional[str]:
+        """Replace an image data URI with its asset URL; any other value is returned as-is."""
+        if not value or not value.startswith('data:'):
+            return value
+        return self.store_data_uri(value) or value
+
+    def asset_name(self, url: str) -> Optional[str]:
+        """Asset name behind one of this store's URLs, or None for any other URL.
+
+        Only the path is compared: pasted HTML may link assets on the API
+        host, which need not be ``public_base_url``, and names are content
+        hashes either way.
+        """
+        path = urlparse(url).path
+        prefix = f"{urlparse(self.public_base_url).path}/assets/"
+        if not path.startswith(prefix):
+            return None
+        name = path[len(prefix):]
+        return name if ASSET_NAME_PATTERN.match(name) else None
+
+    def externalize_html(self, html: str) -> str:
+        """Replace every image data URI in a page with its asset URL."""
+        urls: Dict[str, str] = {}
+
+        def replace(match):
+            uri = match.group(0)
+            if uri not in urls:
+                urls[uri] = self.store_data_uri(uri) or uri
+            return urls[uri]
+
+        return DATA_URI_PATTERN.sub(replace, html)
+
+    @staticmethod
+    def referenced_names(body: bytes) -> Set[str]:
+        """Names of the assets a page or manifest refers to."""
+        return {name.decode('ascii') for name in ASSET_REFERENCE_PATTERN.findall(body)}
+
+    def collect_garbage(self, pages: Iterable[bytes], grace_seconds: Optional[float] = None) -> int:
+        """Delete assets that none of ``pages`` reference and return how many were removed.
+
+        ``pages`` must be every deployed page. Assets stored or reused in
+        the last ``grace_seconds`` are kept, since a deploy stores its
+        images before it saves the page. The variants of every kept asset
+        are kept with it, and a manifest goes when its original does.
+        """
+        grace_seconds = self.gc_grace_seconds if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace_seconds
+
+        kept: Set[str] = set()
+        for page in pages:
+            kept |= self.referenced_names(page)
+
+        assets: Dict[str, Path] = {}
+        for path in self.root.glob('*/*'):
+            if not ASSET_NAME_PATTERN.match(path.name):
+                continue
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    kept.add(path.name)
+            except FileNotFoundError:
+                continue
+            assets[path.name] = path
+
+        # Variants are reached through their original's manifest
+        for name in list(kept):
+            manifest = self._derivatives_path(name)
+            try:
+                kept |= self.referenced_names(manifest.read_bytes())
+            except FileNotFoundError:
+                pass
+
+        removed = 0
+        for name, path in assets.items():
+            if name in kept:
+                continue
+            try:
+                # A deploy may have reused it since the scan
+                if path.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            self._derivatives_path(name).unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+            removed += 1
+        # Leftovers of writes that were interrupted
+        for path in self.root.glob('*/*.tmp'):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+        return removed
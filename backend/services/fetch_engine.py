@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class FetchEngine:
+    """Concurrent HTTP fetcher backed by one pooled async client.
+
+    Requests are fanned out with a bounded concurrency limit and a per-request
+    timeout. A failed request yields ``None`` instead of failing the batch.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('FETCH_MAX_CONCURRENCY', '16'))
+        self.timeout = timeout or float(os.getenv('FETCH_TIMEOUT_SECONDS', '5'))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    async def get_json(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> Optional[Any]:
+        """GET a URL and decode its JSON body, returning None on any failure."""
+        await self.start()
+        try:
+            async with self._semaphore:
+                response = await self._client.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching {url}: {str(e)}")
+            return None
+
+    async def get_json_many(self, requests: List[Dict]) -> List[Optional[Any]]:
+        """Run several ``get_json`` calls concurrently, preserving order.
+
+        Each item of ``requests`` holds the keyword arguments of one call.
+        """
+        return await asyncio.gather(*(self.get_json(**request) for request in requests))
@@ -0,0 +1,108 @@
+import mmap
+import os
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.responses import Response, StreamingResponse
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive (start, end) offsets.
+
+    Returns None when the whole file should be sent. That covers no header,
+    other units, multi-range requests, which servers may answer in full, and
+    invalid ranges such as ``bytes=500-100``, which RFC 9110 says to ignore.
+    Raises RangeNotSatisfiable when the range starts past the end of the file.
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+    spec = range_header[len('bytes='):].strip()
+    if ',' in spec:
+        return None
+    first, sep, last = spec.partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Suffix range: the final N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if end is not None and end < start:
+        return None
+    # Checked on its own so that an open range past the end (bytes=<size>-) is a 416
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+async def _iter_mapped(mapped: mmap.mmap, start: int, end: int) -> AsyncIterator[bytes]:
+    for offset in range(start, end + 1, STREAM_CHUNK_SIZE):
+        yield mapped[offset:min(offset + STREAM_CHUNK_SIZE, end + 1)]
+
+
+class MappedFileResponse(StreamingResponse):
+    """Streams slices of a memory map and closes it once the response is over.
+
+    Closing here rather than in the body iterator also covers a client that
+    is gone before the first chunk, when the iterator never starts.
+    """
+
+    def __init__(self, mapped: mmap.mmap, start: int, end: int, **kwargs):
+        super().__init__(_iter_mapped(mapped, start, end), **kwargs)
+        self.mapped = mapped
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.mapped.close()
+
+
+def mapped_file_response(path: os.PathLike, headers: Dict[str, str], range_header: Optional[str] = None,
+                         media_type: str = "text/html") -> Response:
+    """Stream a file from a read-only memory map, honouring a Range header.
+
+    The file is mapped once, so the response keeps serving the version that
+    was opened even if a redeploy renames a new file over it. Each 64 KB
+    chunk is sliced from the page cache as it is sent. Memory per viewer
+    stays constant however large the page is.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    headers = dict(headers, **{"Accept-Ranges": "bytes"})
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        if mapped is not None:
+            mapped.close()
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if mapped is None:
+        return Response(content=b"", media_type=media_type, headers=headers)
+    if hasattr(mapped, 'madvise'):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return MappedFileResponse(
+        mapped, start, end, status_code=status_code, media_type=media_type, headers=headers
+    )
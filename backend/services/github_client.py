@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.http_cache import ETagStore
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.github.com"
+
+
+class GitHubFetchError(Exception):
+    """A GitHub listing could not be read in full."""
+
+
+class GitHubResponse:
+    """Decoded GitHub API response, either fresh or served from the cache."""
+
+    def __init__(self, status: int, data: Any, headers: Dict[str, str], from_cache: bool = False):
+        self.status = status
+        self.data = data
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class GitHubClient:
+    """GitHub REST client with a persistent conditional-request cache.
+
+    Each cached response keeps its ETag and Last-Modified, and repeat
+    requests revalidate with If-None-Match / If-Modified-Since. GitHub does
+    not count 304 responses against the rate limit, and a 304 restarts the
+    cached entry's TTL. The client tracks X-RateLimit-Remaining. While the
+    limit is exhausted it serves cached data without touching the network.
+    An optional token (GITHUB_TOKEN) raises the limit from 60 to 5000
+    requests per hour.
+    """
+
+    # Response headers worth keeping alongside a cached body
+    KEPT_HEADERS = ('ETag', 'Last-Modified', 'Link')
+
+    def __init__(self, token: Optional[str] = None, cache: Optional[ETagStore] = None,
+                 pool_size: Optional[int] = None, timeout: float = 10):
+        self.token = token or os.getenv('GITHUB_TOKEN')
+        self.timeout = timeout
+        self.cache = cache or ETagStore(
+            max_entries=int(os.getenv('GITHUB_CACHE_MAX_ENTRIES', '1024')),
+            disk_dir=os.getenv('GITHUB_CACHE_DIR', '.cache/github'),
+            ttl_seconds=float(os.getenv('GITHUB_CACHE_TTL_SECONDS', str(30 * 24 * 3600))),
+            max_disk_bytes=int(os.getenv('GITHUB_CACHE_MAX_DISK_MB', '200')) * 1024 * 1024,
+        )
+        # Cached responses are only valid for the identity that fetched them
+        self._identity = hashlib.sha256(self.token.encode()).hexdigest()[:16] if self.token else 'anonymous'
+
+        pool_size = pool_size or int(os.getenv('GITHUB_POOL_SIZE', '16'))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28',
+        })
+        if self.token:
+            self.session.headers['Authorization'] = f"Bearer {self.token}"
+
+        self.rate_limit_remaining: Optional[int] = None
+        self.rate_limit_reset: Optional[float] = None
+        self._rate_lock = threading.Lock()
+
+    def _url(self, path_or_url: str) -> str:
+        return path_or_url if path_or_url.startswith('http') else f"{API_URL}/{path_or_url.lstrip('/')}"
+
+    def _cache_key(self, url: str, params: Optional[Dict]) -> str:
+        query = '&'.join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return ETagStore.key(self._identity, f"{url}?{query}")
+
+    def rate_limited(self) -> bool:
+        """Whether the last known rate limit is exhausted and not yet reset."""
+        with self._rate_lock:
+            return (
+                self.rate_limit_remaining == 0
+                and self.rate_limit_reset is not None
+                and time.time() < self.rate_limit_reset
+            )
+
+    def _update_rate_limit(self, response: requests.Response) -> None:
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        with self._rate_lock:
+            if remaining is not None:
+                self.rate_limit_remaining = int(remaining)
+            if reset is not None:
+                self.rate_limit_reset = float(reset)
+        if remaining is not None and int(remaining) < 5:
+            logger.warning(f"GitHub rate limit nearly exhausted ({remaining} left)")
+
+    def get(self, path_or_url: str, params: Optional[Dict] = None) -> GitHubResponse:
+        """GET an API path or URL, revalidating any cached copy."""
+        url = self._url(path_or_url)
+        key = self._cache_key(url, params)
+        cached = self.cache.get(key)
+
+        if cached is not None and self.rate_limited():
+            return GitHubResponse(cached['status'], cached['data'], cached['headers'], from_cache=True)
+
+        headers = {}
+        if cached is not None:
+            if cached['headers'].get('ETag'):
+                headers['If-None-Match'] = cached['headers']['ETag']
+            if cached['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = cached['headers']['Last-Modified']
+
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"GitHub request to {url} failed: {str(e)}")
+            if cached is not None:
+                return GitHubResponse(cached['status'], cached['data'], cached['headers'], from_cache=True)
+            return GitHubResponse(0, None, {})
+        self._update_rate_limit(response)
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(key)
+            return GitHubResponse(cached['status'], cached['data'], cached['headers'], from_cache=True)
+
+        if response.ok:
+            kept = {name: response.headers[name] for name in self.KEPT_HEADERS if name in response.headers}
+            data = response.json()
+            self.cache.set(key, {'status': response.status_code, 'data': data, 'headers': kept})
+            return GitHubResponse(response.status_code, data, kept)
+
+        if cached is not None and response.status_code in (403, 429):
+            logger.warning(f"GitHub rate limited on {url}; serving cached response")
+            return GitHubResponse(cached['status'], cached['data'], cached['headers'], from_cache=True)
+
+        return GitHubResponse(response.status_code, None, dict(response.headers))
+
+    def get_json(self, path_or_url: str, params: Optional[Dict] = None) -> Optional[Any]:
+        """GET and return the decoded body, or None if the request failed."""
+        response = self.get(path_or_url, params)
+        return response.data if response.ok else None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_github_client() -> GitHubClient:
+    """Return the process-wide GitHub client, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = GitHubClient()
+    return _default_client
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+from services.github_client import GitHubClient, GitHubFetchError, get_github_client
+
+logger = logging.getLogger(__name__)
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Git object lookups are case-sensitive, so each common README name gets an alias
+README_FILENAMES = ('README.md', 'readme.md', 'Readme.md', 'README', 'README.rst', 'README.txt', 'README.markdown')
+
+_README_FIELDS = '\n'.join(
+    f'    readme{i}: object(expression: "HEAD:{filename}") {{ ... on Blob {{ text }} }}'
+    for i, filename in enumerate(README_FILENAMES)
+)
+
+_REPOSITORY_FIELDS = """
+    name
+    description
+    url
+    homepageUrl
+    stargazerCount
+    forkCount
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+    languages(first: 10, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }
+""" + _README_FIELDS
+
+USER_REPOSITORIES_QUERY = """
+query($login: String!, $after: String) {
+  user(login: $login) {
+    repositories(first: 100, after: $after, privacy: PUBLIC, ownerAffiliations: OWNER,
+                 orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { %s }
+    }
+  }
+}
+""" % _REPOSITORY_FIELDS
+
+REPOSITORY_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) { %s }
+}
+""" % _REPOSITORY_FIELDS
+
+
+def request_key(query: str, variables: Dict) -> str:
+    """Stable identifier of a GraphQL request, used to index recordings."""
+    payload = json.dumps({'query': ' '.join(query.split()), 'variables': variables}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class HTTPTransport:
+    """Sends queries to the GitHub GraphQL API over the pooled REST session."""
+
+    def __init__(self, client: Optional[GitHubClient] = None):
+        self.client = client or get_github_client()
+
+    def execute(self, query: str, variables: Dict) -> Dict:
+        response = self.client.session.post(
+            GRAPHQL_URL, json={'query': query, 'variables': variables}, timeout=self.client.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class RecordedTransport:
+    """Replays responses from a JSON recording instead of calling GitHub.
+
+    The recording maps ``request_key(query, variables)`` to the raw response
+    body. It stands in for the API in tests and offline development.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding='utf-8') as f:
+            self.responses = json.load(f)
+
+    def execute(self, query: str, variables: Dict) -> Dict:
+        key = request_key(query, variables)
+        if key not in self.responses:
+            raise KeyError(f"No recorded GraphQL response for variables {variables}")
+        return self.responses[key]
+
+
+class RecordingTransport:
+    """Wraps a live transport and saves every response for later replay."""
+
+    def __init__(self, path: str, transport=None):
+        self.path = path
+        self.transport = transport or HTTPTransport()
+        self._lock = threading.Lock()
+        self.responses = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.responses = json.load(f)
+
+    def execute(self, query: str, variables: Dict) -> Dict:
+        result = self.transport.execute(query, variables)
+        with self._lock:
+            self.responses[request_key(query, variables)] = result
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.responses, f, indent=2, sort_keys=True)
+        return result
+
+
+def _to_repo(node: Dict) -> Dict:
+    """Reshape a GraphQL repository node into the REST repo fields we use.
+
+    The REST shape is extended with ``languages`` (name -> bytes of code)
+    and ``readme`` (text or None).
+    """
+    readme = next((node[f'readme{i}'] for i in range(len(README_FILENAMES)) if node.get(f'readme{i}')), {})
+    return {
+        'name': node['name'],
+        'description': node.get('description'),
+        'html_url': node['url'],
+        'homepage': node.get('homepageUrl'),
+        'stargazers_count': node.get('stargazerCount', 0),
+        'forks_count': node.get('forkCount', 0),
+        'topics': [t['topic']['name'] for t in (node.get('repositoryTopics') or {}).get('nodes', [])],
+        'languages': {e['node']['name']: e['size'] for e in (node.get('languages') or {}).get('edges', [])},
+        'readme': readme.get('text'),
+    }
+
+
+class GitHubGraphQLClient:
+    """Fetches repository metadata for a whole user in bulk.
+
+    One query returns up to 100 repositories with topics, homepage, stars,
+    forks, language breakdown and README text. A portfolio import therefore
+    costs one or two requests instead of one or more per repo. GraphQL needs
+    a token, so check ``available()`` before relying on it.
+
+    Complete listings are kept per user for a while, so looking up one of
+    their repositories afterwards (``get_repository``) costs no request.
+    Failed requests raise GitHubFetchError, so callers can fall back to
+    REST rather than work from a partial listing.
+    """
+
+    def __init__(self, transport=None, index_ttl: Optional[float] = None, max_indexed_users: Optional[int] = None):
+        self.transport = transport or HTTPTransport()
+        self.index_ttl = index_ttl or float(os.getenv('GITHUB_REPO_INDEX_TTL_SECONDS', '600'))
+        self.max_indexed_users = max_indexed_users or int(os.getenv('GITHUB_REPO_INDEX_MAX_USERS', '64'))
+        self._index: OrderedDict = OrderedDict()
+        self._index_lock = threading.Lock()
+
+    def available(self) -> bool:
+        if isinstance(self.transport, HTTPTransport):
+            return bool(self.transport.client.token)
+        return True
+
+    def _execute(self, query: str, variables: Dict) -> Dict:
+        try:
+            result = self.transport.execute(query, variables)
+        except Exception as e:
+            raise GitHubFetchError(f"GitHub GraphQL request failed: {str(e)}") from e
+        if not isinstance(result, dict):
+            raise GitHubFetchError("Malformed GitHub GraphQL response")
+        # An unknown login or repo is a null field with a NOT_FOUND error
+        errors = [error for error in result.get('errors') or [] if error.get('type') != 'NOT_FOUND']
+        if errors:
+            raise GitHubFetchError(f"GitHub GraphQL errors: {errors}")
+        if not isinstance(result.get('data'), dict):
+            raise GitHubFetchError("GitHub GraphQL response has no data")
+        return result['data']
+
+    def iter_repository_pages(self, login: str) -> Iterator[List[Dict]]:
+        """Yield the user's public repositories, one page of up to 100 at a time.
+
+        A listing that is read to the end is indexed for ``get_repository``.
+        Raises GitHubFetchError when a page cannot be fetched or read.
+        """
+        after = None
+        repos = []
+        while True:
+            data = self._execute(USER_REPOSITORIES_QUERY, {'login': login, 'after': after})
+            if not data.get('user'):
+                # Organisations and unknown logins have no user repositories
+                self._remember(login, [])
+                return
+            try:
+                repositories = data['user']['repositories']
+                page = [_to_repo(node) for node in repositories['nodes']]
+                has_next, after = repositories['pageInfo']['hasNextPage'], repositories['pageInfo']['endCursor']
+            except (KeyError, TypeError) as e:
+                raise GitHubFetchError(f"Malformed GitHub GraphQL repository page: {str(e)}") from e
+            repos.extend(page)
+            yield page
+            if not has_next:
+                self._remember(login, repos)
+                return
+
+    def fetch_user_repositories(self, login: str) -> List[Dict]:
+        repos = []
+        for page in self.iter_repository_pages(login):
+            repos.extend(page)
+        return repos
+
+    def _remember(self, login: str, repos: List[Dict]) -> None:
+        with self._index_lock:
+            self._index[login.lower()] = (time.time(), {repo['name'].lower(): repo for repo in repos})
+            self._index.move_to_end(login.lower())
+            while len(self._index) > self.max_indexed_users:
+                self._index.popitem(last=False)
+
+    def _indexed(self, login: str) -> Optional[Dict[str, Dict]]:
+        with self._index_lock:
+            entry = self._index.get(login.lower())
+            if entry is None or time.time() - entry[0] >= self.index_ttl:
+                return None
+            return entry[1]
+
+    def get_repository(self, owner: str, name: str) -> Optional[Dict]:
+        """One repository, from its owner's listing if that was fetched recently.
+
+        Otherwise a single-repository query is sent; the owner's other
+        repositories are not fetched.
+        """
+        repos = self._indexed(owner)
+        if repos and name.lower() in repos:
+            return repos[name.lower()]
+        return self.fetch_repository(owner, name)
+
+    def fetch_repository(self, owner: str, name: str) -> Optional[Dict]:
+        data = self._execute(REPOSITORY_QUERY, {'owner': owner, 'name': name})
+        if not data.get('repository'):
+            return None
+        try:
+            return _to_repo(data['repository'])
+        except (KeyError, TypeError) as e:
+            raise GitHubFetchError(f"Malformed GitHub GraphQL repository: {str(e)}") from e
+
+
+_default_client = None
+
+def get_graphql_client() -> GitHubGraphQLClient:
+    """Return the process-wide GraphQL client, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = GitHubGraphQLClient()
+    return _default_client
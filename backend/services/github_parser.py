@@ -1,41 +1,97 @@
 import requests
 import base64
+import logging
 import pprint
 from urllib.parse import urlparse
 from PIL import Image
 from io import BytesIO
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from services.github_client import GitHubFetchError, get_github_client
+from services.github_graphql import get_graphql_client
 
-def get_public_repos(username):
-    url = f"https://api.github.com/users/{username}/repos"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error: Unable to fetch repositories (Status Code: {response.status_code})")
+logger = logging.getLogger(__name__)
+
+# Avatars are downsampled to this size before counting colors
+AVATAR_SAMPLE_SIZE = 64
+# Identicons use far fewer distinct colors than this
+MAX_DEFAULT_AVATAR_COLORS = 100
+# How long an avatar verdict is trusted before revalidating with its ETag
+AVATAR_VERDICT_TTL = 3600
+AVATAR_CACHE_SIZE = 1024
+# GitHub's maximum page size for repository listings
+REPOS_PER_PAGE = 100
+
+# url -> (checked_at, etag, is_default)
+_avatar_verdicts = OrderedDict()
+_avatar_lock = threading.Lock()
+
+def _next_page_url(link_header):
+    """Return the rel="next" URL from a GitHub Link header, if any."""
+    if not link_header:
         return None
+    for part in link_header.split(','):
+        url, _, rel = part.partition(';')
+        if 'rel="next"' in rel:
+            return url.strip().strip('<>')
+    return None
+
+def iter_repo_pages(username, per_page=REPOS_PER_PAGE):
+    """Yield the user's public repos one page at a time.
+
+    Follows the Link rel="next" header. The next page is requested in the
+    background while the caller processes the current one, so only about
+    two pages are in memory at once.
+
+    A user that does not exist has no repos. Any other failed page raises
+    GitHubFetchError, so a partial listing is never passed off as complete.
+    """
+    client = get_github_client()
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = prefetcher.submit(client.get, f"users/{username}/repos", {'per_page': per_page})
+        first = True
+        while pending is not None:
+            response = pending.result()
+            if first and response.status == 404:
+                logger.info(f"GitHub user {username} not found")
+                return
+            if response.status != 200:
+                raise GitHubFetchError(f"Unable to fetch repositories of {username} (status {response.status})")
+            first = False
+            next_url = _next_page_url(response.headers.get('Link'))
+            pending = prefetcher.submit(client.get, next_url) if next_url else None
+            yield response.data
+
+def iter_public_repos(username, per_page=REPOS_PER_PAGE):
+    """Yield every public repo of the user, across all pages."""
+    for page in iter_repo_pages(username, per_page):
+        yield from page
+
+def get_public_repos(username):
+    return list(iter_public_repos(username))
 
 def get_user(username):
-    url = f"https://api.github.com/users/{username}"
-    response = requests.get(url)
+    response = get_github_client().get(f"users/{username}")
     
-    if response.status_code == 200:
-        user_data = response.json()
+    if response.status == 200:
+        user_data = response.data
         return user_data
     else:
-        print(f"Error: Unable to fetch user info (Status Code: {response.status_code})")
+        logger.warning(f"Unable to fetch user info for {username} (status {response.status})")
         return None
 
 def get_readme(username, repo):
-    url = f"https://api.github.com/repos/{username}/{repo}/readme"
-    response = requests.get(url)
+    response = get_github_client().get(f"repos/{username}/{repo}/readme")
     
-    if response.status_code == 200:
-        readme_data = response.json()
+    if response.status == 200:
+        readme_data = response.data
         readme_content = base64.b64decode(readme_data['content']).decode('utf-8')
         return readme_content
     else:
-        print(f"No README found for {repo}.")
+        logger.info(f"No README found for {repo}")
         return None
 
 def extract_username(url):
@@ -46,24 +102,82 @@ def extract_username(url):
         return path_parts[0]  # First part of the path is the username
     return None
 
+def _is_default_image(avatar):
+    """Identicons have a handful of flat colors; photos have many more.
+
+    The image is shrunk first (JPEG decoding at reduced scale via ``draft``,
+    then nearest-neighbour so no blended colors are introduced), and
+    ``getcolors`` stops counting once the limit is exceeded.
+    """
+    avatar.draft('RGB', (AVATAR_SAMPLE_SIZE, AVATAR_SAMPLE_SIZE))
+    if avatar.mode == 'P':
+        # Palette transparency must go through RGBA to convert cleanly
+        avatar = avatar.convert('RGBA')
+    avatar = avatar.convert('RGB')
+    if max(avatar.size) > AVATAR_SAMPLE_SIZE:
+        avatar = avatar.resize((AVATAR_SAMPLE_SIZE, AVATAR_SAMPLE_SIZE), Image.NEAREST)
+    return avatar.getcolors(maxcolors=MAX_DEFAULT_AVATAR_COLORS) is not None
+
+def _cached_verdict(url):
+    with _avatar_lock:
+        entry = _avatar_verdicts.get(url)
+        if entry is None:
+            return None
+        _avatar_verdicts.move_to_end(url)
+        return entry
+
+def _store_verdict(url, etag, is_default):
+    with _avatar_lock:
+        _avatar_verdicts[url] = (time.monotonic(), etag, is_default)
+        _avatar_verdicts.move_to_end(url)
+        while len(_avatar_verdicts) > AVATAR_CACHE_SIZE:
+            _avatar_verdicts.popitem(last=False)
+
+def _fetch_avatar(url, want_image):
+    """Return (image or None, is_default) for an avatar URL.
+
+    Verdicts are cached per URL. A fresh verdict is reused without any
+    request; a stale one is revalidated with its ETag. The image itself is
+    only downloaded when the verdict is unknown or the caller needs it.
+    """
+    cached = _cached_verdict(url)
+    if cached is not None:
+        checked_at, etag, is_default = cached
+        if is_default or not want_image:
+            if time.monotonic() - checked_at < AVATAR_VERDICT_TTL:
+                return None, is_default
+            if etag:
+                response = requests.get(url, headers={'If-None-Match': etag}, timeout=10)
+                if response.status_code == 304:
+                    _store_verdict(url, etag, is_default)
+                    return None, is_default
+                return _judge_avatar(url, response)
+
+    return _judge_avatar(url, requests.get(url, timeout=10))
+
+def _judge_avatar(url, response):
+    response.raise_for_status()
+    avatar = Image.open(BytesIO(response.content))
+    is_default = _is_default_image(avatar)
+    _store_verdict(url, response.headers.get('ETag'), is_default)
+    return avatar, is_default
+
+def is_default_avatar(url):
+    """Whether the avatar at url is a generated identicon, or None if unknown."""
+    try:
+        return _fetch_avatar(url, want_image=False)[1]
+    except Exception:
+        return None
+
 def get_image_if_not_default(user_data):
     url = user_data['avatar_url']
     try:
-        response = requests.get(url)
-        avatar = Image.open(BytesIO(response.content))
-    except:
+        avatar, is_default = _fetch_avatar(url, want_image=True)
+    except Exception:
         return None
-    colors = set()
-    pixels = avatar.load()
-    width, height = avatar.size
-    for x in range(width):
-        for y in range(height):
-            r, g, b = pixels[x, y]
-            colors.add((r, g, b))
-    if len(colors) > 100:
-        return avatar
-    else:
+    if is_default:
         return None
+    return avatar
 
 def get_user_data(username):
     user = get_user(username)
@@ -83,32 +197,60 @@ def get_user_data(username):
         return None
     return user_data
 
-def get_projects_with_description(username):
-    repos = get_public_repos(username)
-    if repos is None:
+def _repo_to_project(repo):
+    if not repo.get('description'):
         return None
-    
-    projects = []
-    for repo in repos:
-        if not repo.get('description'):
-            continue
-            
-        name = repo['name']
-        description = repo['description']
-        url = repo['html_url']
-        project = {
-            'name': name, 
-            'description': description, 
-            'url': url
-        }
         
-        if 'topics' in repo and repo['topics']:
-            project['topics'] = repo['topics']
-        if 'homepage' in repo and repo['homepage']:
-            project['homepage'] = repo['homepage']
-            
-        projects.append(project)
+    name = repo['name']
+    description = repo['description']
+    url = repo['html_url']
+    project = {
+        'name': name, 
+        'description': description, 
+        'url': url
+    }
     
+    if 'topics' in repo and repo['topics']:
+        project['topics'] = repo['topics']
+    if 'homepage' in repo and repo['homepage']:
+        project['homepage'] = repo['homepage']
+    # Only present on repos fetched through GraphQL
+    if repo.get('languages'):
+        project['languages'] = list(repo['languages'])
+    if repo.get('readme'):
+        project['readme'] = repo['readme']
+        
+    return project
+
+def iter_project_pages(username):
+    """Yield lists of described projects, one list per page of repos.
+
+    With a token, pages come from the GraphQL API, 100 repos per request
+    including topics, languages and README text. Anonymous callers, and
+    callers whose first GraphQL request fails, fall back to the REST
+    listing. A failure after the first page raises GitHubFetchError.
+    """
+    graphql = get_graphql_client()
+    pages = None
+    if graphql.available():
+        graph_pages = graphql.iter_repository_pages(username)
+        try:
+            first_page = next(graph_pages, None)
+        except GitHubFetchError as e:
+            logger.warning(f"Falling back to the REST listing: {str(e)}")
+        else:
+            pages = itertools.chain([] if first_page is None else [first_page], graph_pages)
+    if pages is None:
+        pages = iter_repo_pages(username)
+    for page in pages:
+        projects = [project for project in map(_repo_to_project, page) if project]
+        if projects:
+            yield projects
+
+def get_projects_with_description(username):
+    projects = []
+    for page in iter_project_pages(username):
+        projects.extend(page)
     return projects
             
 
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Preferred first when the client accepts several equally
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """Pick the best stored Content-Encoding the client accepts, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+
+    available = set(available)
+    best, best_q = None, 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def make_etag(digest: str, encoding: Optional[str] = None) -> str:
+    """Strong ETag for one representation; each encoding gets its own tag."""
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    """Whether If-None-Match names any representation of the content ``digest``.
+
+    Comparison is weak, as RFC 9110 requires for If-None-Match, so a tag
+    for the gzip variant also validates the brotli or identity one.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag.strip('"').split('-', 1)[0] == digest:
+            return True
+    return False
+
+
+class ETagStore:
+    """Responses fetched from an upstream API, kept with the validators to revalidate them.
+
+    An entry is a JSON-serializable dict holding the response body and its
+    ETag / Last-Modified headers. Entries live in an in-memory LRU and,
+    when ``disk_dir`` is set, as one JSON file each so they survive
+    restarts. An entry expires ``ttl_seconds`` after it was stored or last
+    revalidated. ``touch`` restarts that clock when the upstream answers
+    304, so a response that keeps validating never expires. The disk tier
+    is capped at ``max_disk_bytes``, dropping the least recently
+    validated entries first.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: Optional[str], ttl_seconds: float, max_disk_bytes: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._disk_bytes = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(f.stat().st_size for f in self.disk_dir.glob('*/*.json'))
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                stored_at, entry = cached
+                if now - stored_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return entry
+                del self._memory[key]
+
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stored_at = path.stat().st_mtime
+            if now - stored_at >= self.ttl_seconds:
+                self._remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable HTTP cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+        with self._lock:
+            self._remember(key, entry, stored_at)
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, entry, time.time())
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    def touch(self, key: str) -> None:
+        """Restart an entry's TTL after the upstream confirmed it is still current."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._remember(key, cached[1], now)
+        if self.disk_dir:
+            try:
+                os.utime(self._disk_path(key), (now, now))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key: str, entry: Dict[str, Any], stored_at: float) -> None:
+        # Caller holds the lock
+        self._memory[key] = (stored_at, entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(exist_ok=True)
+            data = json.dumps(entry).encode('utf-8')
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write HTTP cache entry {path}: {str(e)}")
+            return
+        finally:
+            if tmp_path is not None:
+                self._remove(Path(tmp_path))
+
+        with self._lock:
+            self._disk_bytes += len(data) - replaced
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Drop expired entries, then the least recently validated, until under 90% of the cap."""
+        now = time.time()
+        entries = []
+        for path in self.disk_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for mtime, size, path in entries:
+            if total <= target and now - mtime < self.ttl_seconds:
+                continue
+            self._remove(path)
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,67 @@
+import os
+from io import BytesIO
+from typing import Dict, Optional, Sequence
+
+from PIL import Image, ImageOps
+
+DERIVATIVE_WIDTHS = tuple(int(w) for w in os.getenv('IMAGE_DERIVATIVE_WIDTHS', '320,640,1280').split(','))
+WEBP_QUALITY = int(os.getenv('IMAGE_WEBP_QUALITY', '80'))
+JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '82'))
+
+
+def flatten(img: Image.Image) -> Image.Image:
+    """Composite transparency onto white, since JPEG has no alpha channel."""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def _encode(img: Image.Image, fmt: str, **options) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def render_derivatives(data: bytes, widths: Sequence[int] = DERIVATIVE_WIDTHS) -> Optional[Dict]:
+    """Resize an image to each width in WebP, plus one JPEG fallback.
+
+    Images are never upscaled. A source narrower than the largest width
+    also gets a variant at its own width. Each step is resized from the
+    previous, larger one, and the JPEG fallback uses the largest variant.
+    Returns None for animated images, which are left as they are.
+
+    Meant to run in the CPU process pool, so it takes and returns plain
+    bytes.
+    """
+    img = Image.open(BytesIO(data))
+    if getattr(img, 'is_animated', False):
+        return None
+    # Decode JPEGs at a reduced scale when even the largest variant is much
+    # smaller. A square box keeps enough pixels whichever way EXIF rotates it.
+    img.draft('RGB', (max(widths), max(widths)))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+    source_width, source_height = img.size
+    targets = sorted({w for w in widths if w < source_width} | {min(source_width, max(widths))}, reverse=True)
+
+    webp = {}
+    current = img
+    for width in targets:
+        height = max(1, round(source_height * width / source_width))
+        if current.width != width:
+            current = current.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        webp[width] = _encode(current, 'WEBP', quality=WEBP_QUALITY, method=4)
+        if width == targets[0]:
+            fallback = _encode(flatten(current), 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+    return {
+        'width': targets[0],
+        'height': max(1, round(source_height * targets[0] / source_width)),
+        'webp': webp,
+        'jpeg': fallback,
+    }
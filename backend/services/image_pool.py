@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from services.fetch_engine import FetchEngine
+
+logger = logging.getLogger(__name__)
+
+UNSPLASH_RANDOM_URL = "https://api.unsplash.com/photos/random"
+# Most photos Unsplash returns from one /photos/random call
+UNSPLASH_MAX_COUNT = 30
+
+
+class ImagePool:
+    """Pre-fetched Unsplash image URLs per keyword, persisted to disk.
+
+    A background task tops the pool up with one ``count=30`` request per
+    keyword whenever that keyword's batch is older than ``ttl_seconds``.
+    Assigning an image is a round-robin lookup in memory, so request
+    handlers never call Unsplash. This matters with the demo quota of 50
+    requests per hour.
+    """
+
+    def __init__(self, fetch_engine: FetchEngine, keywords: List[str], access_key: Optional[str] = None,
+                 path: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 check_interval: Optional[float] = None):
+        self.fetch_engine = fetch_engine
+        self.keywords = keywords
+        self.access_key = access_key or os.getenv('UNSPLASH_ACCESS_KEY')
+        self.path = path or os.getenv('UNSPLASH_POOL_FILE', '.cache/unsplash_pool.json')
+        self.ttl_seconds = ttl_seconds or float(os.getenv('UNSPLASH_POOL_TTL_SECONDS', str(24 * 3600)))
+        self.check_interval = check_interval or float(os.getenv('UNSPLASH_POOL_CHECK_SECONDS', '600'))
+
+        # keyword -> {'fetched_at': timestamp, 'urls': [...]}
+        self._pool: Dict[str, Dict] = self._load()
+        self._cursors: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading image pool from {self.path}: {str(e)}")
+            return {}
+
+    def _save(self, pool: Dict[str, Dict]) -> None:
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(pool, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _stale_keywords(self) -> List[str]:
+        now = time.time()
+        return [
+            keyword for keyword in self.keywords
+            if now - self._pool.get(keyword, {}).get('fetched_at', 0) >= self.ttl_seconds
+        ]
+
+    async def refresh(self) -> None:
+        """Fetch a new batch for every keyword whose batch has expired."""
+        if not self.access_key:
+            return
+        stale = self._stale_keywords()
+        if not stale:
+            return
+
+        batches = await self.fetch_engine.get_json_many([
+            {
+                "url": UNSPLASH_RANDOM_URL,
+                "params": {"query": keyword, "orientation": "landscape", "count": UNSPLASH_MAX_COUNT},
+                "headers": {"Authorization": f"Client-ID {self.access_key}"},
+            }
+            for keyword in stale
+        ])
+
+        pool = dict(self._pool)
+        for keyword, photos in zip(stale, batches):
+            try:
+                urls = [photo["urls"]["regular"] for photo in photos or []]
+            except (KeyError, TypeError) as e:
+                logger.error(f"Unexpected Unsplash payload for '{keyword}': {str(e)}")
+                continue
+            # Keep serving the old batch if the refresh came back empty
+            if urls:
+                pool[keyword] = {'fetched_at': time.time(), 'urls': urls}
+        self._pool = pool
+
+        try:
+            await asyncio.to_thread(self._save, pool)
+        except Exception as e:
+            logger.error(f"Error saving image pool to {self.path}: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Image pool refresh failed: {str(e)}")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        """Start refreshing in the background; a no-op without an access key."""
+        if self._task is None and self.access_key:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def assign(self, index: int) -> Optional[str]:
+        """Image URL for the project at ``index`` of a listing, or None.
+
+        Projects cycle through the keywords, and each keyword cycles through
+        its URLs. A keyword with no images yet borrows from the next one.
+        """
+        for step in range(len(self.keywords)):
+            keyword = self.keywords[(index + step) % len(self.keywords)]
+            urls = self._pool.get(keyword, {}).get('urls')
+            if urls:
+                cursor = self._cursors.get(keyword, 0)
+                self._cursors[keyword] = cursor + 1
+                return urls[cursor % len(urls)]
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            keyword: {
+                'images': len(self._pool.get(keyword, {}).get('urls', [])),
+                'fetched_at': self._pool.get(keyword, {}).get('fetched_at'),
+            }
+            for keyword in self.keywords
+        }
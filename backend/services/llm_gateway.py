@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, List, Optional
+
+from openai import AsyncAzureOpenAI, AzureOpenAI
+
+from services.rate_limiter import TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class LLMGateway:
+    """Single entry point for chat completions.
+
+    Every call is keyed on a hash of (model, messages, temperature,
+    max_tokens). Identical calls are answered from a bounded LRU/TTL cache,
+    and identical calls already in flight are coalesced so only one request
+    reaches Azure OpenAI. Token usage and latency are tracked per call site.
+
+    ``complete`` serves sync callers through ``client`` and ``acomplete``
+    serves coroutines through ``async_client``; both share one cache.
+    Calls that actually reach the API first wait on ``rate_limiter``.
+    """
+
+    def __init__(self, client: Optional[AzureOpenAI] = None, async_client: Optional[AsyncAzureOpenAI] = None,
+                 rate_limiter: Optional[TokenBucketLimiter] = None,
+                 max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.client = client
+        self.async_client = async_client
+        self.rate_limiter = rate_limiter or TokenBucketLimiter()
+        self.max_entries = max_entries or int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512'))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('LLM_CACHE_TTL_SECONDS', '3600'))
+        self._cache: OrderedDict = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'calls': 0,
+            'cache_hits': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+            'streams': 0,
+            'total_first_token_latency': 0.0,
+        })
+
+    @staticmethod
+    def cache_key(model: str, messages: List[Dict], temperature: float, max_tokens: Optional[int]) -> str:
+        """Hash the request parameters in a canonical JSON form."""
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens},
+            sort_keys=True,
+            separators=(',', ':'),
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict], max_tokens: Optional[int]) -> int:
+        """Rough token cost of a call: ~4 characters per prompt token plus the completion budget."""
+        prompt_chars = 0
+        for message in messages:
+            content = message.get('content')
+            if isinstance(content, str):
+                prompt_chars += len(content)
+            elif isinstance(content, list):
+                for part in content:
+                    if part.get('type') == 'text':
+                        prompt_chars += len(part.get('text', ''))
+                    elif part.get('image_url', {}).get('detail') == 'low':
+                        # Low-detail images are billed at a flat rate
+                        prompt_chars += 85 * 4
+                    else:
+                        # Otherwise assume four 512px tiles, a 1024px square
+                        prompt_chars += (85 + 4 * 170) * 4
+        return prompt_chars // 4 + (max_tokens or 256)
+
+    def complete(self, call_site: str, messages: List[Dict], model: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: Optional[int] = None) -> str:
+        """Return the completion text for a chat request."""
+        model = model or os.getenv('AZURE_OPENAI_MODEL')
+        key = self.cache_key(model, messages, temperature, max_tokens)
+
+        with self._lock:
+            stats = self._stats[call_site]
+            cached = self._cache_get(key)
+            if cached is not None:
+                stats['cache_hits'] += 1
+                return cached
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                leader_future = Future()
+                self._inflight[key] = leader_future
+            else:
+                stats['coalesced'] += 1
+
+        if inflight is not None:
+            return inflight.result()
+
+        try:
+            content = self._call(call_site, model, messages, temperature, max_tokens)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            leader_future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._cache_set(key, content)
+            self._inflight.pop(key, None)
+        leader_future.set_result(content)
+        return content
+
+    async def acomplete(self, call_site: str, messages: List[Dict], model: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: Optional[int] = None) -> str:
+        """Async version of ``complete`` using the shared async client."""
+        model = model or os.getenv('AZURE_OPENAI_MODEL')
+        key = self.cache_key(model, messages, temperature, max_tokens)
+
+        with self._lock:
+            stats = self._stats[call_site]
+            cached = self._cache_get(key)
+            if cached is not None:
+                stats['cache_hits'] += 1
+                return cached
+            task = self._async_inflight.get(key)
+            if task is None:
+                # The call runs in its own task, so no caller's cancellation reaches it
+                task = asyncio.ensure_future(self._acall(call_site, model, messages, temperature, max_tokens))
+                self._async_inflight[key] = task
+                task.add_done_callback(lambda done: self._finish_async_call(key, done))
+            else:
+                stats['coalesced'] += 1
+
+        return await asyncio.shield(task)
+
+    def _finish_async_call(self, key: str, task: asyncio.Future) -> None:
+        with self._lock:
+            self._async_inflight.pop(key, None)
+            if task.cancelled():
+                return
+            # Retrieving the exception also keeps it from being logged as unhandled
+            # when every caller has gone away
+            if task.exception() is None:
+                self._cache_set(key, task.result())
+
+    async def astream(self, call_site: str, messages: List[Dict], model: Optional[str] = None,
+                      temperature: float = 0.7, max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Yield completion text as it arrives from the Azure stream API.
+
+        A cached answer is yielded in one piece; a finished stream is cached
+        like any other completion. Streams are not coalesced. The usage
+        reported in the last chunk corrects the rate limiter's estimate.
+        """
+        model = model or os.getenv('AZURE_OPENAI_MODEL')
+        key = self.cache_key(model, messages, temperature, max_tokens)
+
+        with self._lock:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._stats[call_site]['cache_hits'] += 1
+        if cached is not None:
+            yield cached
+            return
+
+        estimated_tokens = self.estimate_tokens(messages, max_tokens)
+        await self.rate_limiter.acquire(estimated_tokens)
+
+        started = time.perf_counter()
+        first_token_latency = None
+        usage = None
+        parts = []
+        try:
+            stream = await self.async_client.chat.completions.create(
+                stream=True, stream_options={'include_usage': True},
+                **self._params(model, messages, temperature, max_tokens)
+            )
+            async for chunk in stream:
+                # The last chunk carries the usage and no choices
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                # Azure also sends content-filter results in chunks without choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token_latency is None:
+                    first_token_latency = time.perf_counter() - started
+                parts.append(delta)
+                yield delta
+        except Exception:
+            self._record_error(call_site)
+            raise
+
+        content = ''.join(parts)
+        latency = time.perf_counter() - started
+        if usage:
+            await self.rate_limiter.areconcile(estimated_tokens, usage.total_tokens)
+        with self._lock:
+            stats = self._stats[call_site]
+            stats['calls'] += 1
+            stats['streams'] += 1
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            stats['total_first_token_latency'] += first_token_latency or latency
+            if usage:
+                stats['prompt_tokens'] += usage.prompt_tokens
+                stats['completion_tokens'] += usage.completion_tokens
+            self._cache_set(key, content)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {call_site: dict(stats) for call_site, stats in self._stats.items()}
+
+    def _call(self, call_site: str, model: str, messages: List[Dict], temperature: float,
+              max_tokens: Optional[int]) -> str:
+        estimated_tokens = self.estimate_tokens(messages, max_tokens)
+        self.rate_limiter.acquire_blocking(estimated_tokens)
+
+        started = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**self._params(model, messages, temperature, max_tokens))
+        except Exception:
+            self._record_error(call_site)
+            raise
+        if response.usage:
+            self.rate_limiter.reconcile(estimated_tokens, response.usage.total_tokens)
+        return self._record(call_site, response, time.perf_counter() - started)
+
+    async def _acall(self, call_site: str, model: str, messages: List[Dict], temperature: float,
+                     max_tokens: Optional[int]) -> str:
+        estimated_tokens = self.estimate_tokens(messages, max_tokens)
+        await self.rate_limiter.acquire(estimated_tokens)
+
+        started = time.perf_counter()
+        try:
+            response = await self.async_client.chat.completions.create(
+                **self._params(model, messages, temperature, max_tokens)
+            )
+        except Exception:
+            self._record_error(call_site)
+            raise
+        if response.usage:
+            await self.rate_limiter.areconcile(estimated_tokens, response.usage.total_tokens)
+        return self._record(call_site, response, time.perf_counter() - started)
+
+    @staticmethod
+    def _params(model: str, messages: List[Dict], temperature: float, max_tokens: Optional[int]) -> Dict:
+        params = {'model': model, 'messages': messages, 'temperature': temperature}
+        if max_tokens is not None:
+            params['max_tokens'] = max_tokens
+        return params
+
+    def _record_error(self, call_site: str) -> None:
+        with self._lock:
+            self._stats[call_site]['errors'] += 1
+
+    def _record(self, call_site: str, response, latency: float) -> str:
+        """Account for a finished call and return its completion text."""
+        with self._lock:
+            stats = self._stats[call_site]
+            stats['calls'] += 1
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            if response.usage:
+                stats['prompt_tokens'] += response.usage.prompt_tokens
+                stats['completion_tokens'] += response.usage.completion_tokens
+
+        return response.choices[0].message.content
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, content = entry
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return content
+
+    def _cache_set(self, key: str, content: str) -> None:
+        self._cache[key] = (time.monotonic(), content)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
@@ -1,30 +1,94 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
 from PIL import Image
 
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp'}
+
+
+def _rgb_mean(rgb: np.ndarray) -> np.ndarray:
+    # uint16 holds the sum of three channels without overflow
+    return rgb.sum(axis=2, dtype=np.uint16) / 3
+
+
+def make_white_transparent(rgb: np.ndarray) -> np.ndarray:
+    """Alpha channel that fades light pixels out: 255 - max(mean - 100, 0)."""
+    avg = np.maximum(_rgb_mean(rgb) - 100, 0)
+    return (255 - avg).astype(np.uint8)
+
+
+def make_black_transparent(rgb: np.ndarray) -> np.ndarray:
+    """Alpha channel that fades dark pixels out: min(mean + 100, 255)."""
+    return np.minimum(_rgb_mean(rgb) + 100, 255).astype(np.uint8)
+
+
+TRANSFORMS = {
+    'white': make_white_transparent,
+    'black': make_black_transparent,
+}
+
+
+def apply_transparency(img: Image.Image, func: Callable[[np.ndarray], np.ndarray]) -> Image.Image:
+    """Return an RGBA copy of img with its alpha channel computed by func."""
+    img = img.convert("RGB")
+    alpha = func(np.asarray(img))
+    img.putalpha(Image.fromarray(alpha, mode="L"))
+    return img
+
+
+def remove_background(data: bytes, mode: str = 'white') -> bytes:
+    """Process an encoded logo in memory and return it as PNG bytes."""
+    img = apply_transparency(Image.open(BytesIO(data)), TRANSFORMS[mode])
+    buffer = BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
 def main(img_path, out_path, func):
-    img = Image.open(img_path)
-    img = img.convert("RGBA")
-    new_data = func(img.getdata())
-    img.putdata(new_data)
+    img = apply_transparency(Image.open(img_path), func)
     img.save(out_path, "PNG")
 
-def make_white_transparent(data):
-    new_data = []
-    for item in data:
-        avg = (item[0] + item[1] + item[2]) / 3 - 100
-        avg = max(avg, 0)
-        transparency = (255 - avg)
-        new_data.append((item[0], item[1], item[2], int(transparency)))
-    return new_data
-
-def make_black_transparent(data):
-    new_data = []
-    for item in data:
-        avg = (item[0] + item[1] + item[2]) / 3 + 100
-        avg = min(avg, 255)
-        transparency = avg
-        new_data.append((item[0], item[1], item[2], int(transparency)))
-    return new_data
+
+def _process_file(args) -> str:
+    img_path, out_path, mode = args
+    main(img_path, out_path, TRANSFORMS[mode])
+    return out_path
+
+
+def process_directory(source_dir: str, dest_dir: str, mode: str = 'white',
+                      workers: Optional[int] = None) -> List[str]:
+    """Process every image in source_dir into dest_dir as PNG, across a process pool."""
+    dest = Path(dest_dir)
+    dest.mkdir(parents=True, exist_ok=True)
+    jobs = [
+        (str(path), str(dest / f"{path.stem}_transparent.png"), mode)
+        for path in sorted(Path(source_dir).iterdir())
+        if path.suffix.lower() in IMAGE_EXTENSIONS
+    ]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return list(executor.map(_process_file, jobs))
+
 
 if __name__ == '__main__':
-    main("./logo/logo_black.jpeg", "./logo/logo_black_transparent.png", make_white_transparent)
-    main("./logo/logo_white.jpeg", "./logo/logo_white_transparent.png", make_black_transparent)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Make logo backgrounds transparent")
+    parser.add_argument('source', nargs='?', help="Directory of logos to process")
+    parser.add_argument('dest', nargs='?', help="Directory to write transparent PNGs to")
+    parser.add_argument('--mode', choices=sorted(TRANSFORMS), default='white',
+                        help="Which background colour to make transparent")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.source:
+        for out_path in process_directory(args.source, args.dest or args.source, args.mode, args.workers):
+            print(out_path)
+    else:
+        main("./logo/logo_black.jpeg", "./logo/logo_black_transparent.png", make_white_transparent)
+        main("./logo/logo_white.jpeg", "./logo/logo_white_transparent.png", make_black_transparent)
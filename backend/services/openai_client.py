@@ -0,0 +1,42 @@
+import os
+
+import httpx
+from openai import AsyncAzureOpenAI, AzureOpenAI
+
+API_VERSION = "2024-02-15-preview"
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv('AZURE_OPENAI_MAX_CONNECTIONS', '50')),
+        max_keepalive_connections=int(os.getenv('AZURE_OPENAI_MAX_KEEPALIVE', '20')),
+        keepalive_expiry=float(os.getenv('AZURE_OPENAI_KEEPALIVE_SECONDS', '60')),
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv('AZURE_OPENAI_TIMEOUT_SECONDS', '60')),
+        connect=float(os.getenv('AZURE_OPENAI_CONNECT_TIMEOUT_SECONDS', '5')),
+    )
+
+
+def _client_kwargs() -> dict:
+    return {
+        'azure_endpoint': os.getenv('AZURE_OPENAI_ENDPOINT'),
+        'api_key': os.getenv('AZURE_OPENAI_API_KEY'),
+        'api_version': API_VERSION,
+        'max_retries': int(os.getenv('AZURE_OPENAI_MAX_RETRIES', '2')),
+    }
+
+
+def create_async_client() -> AsyncAzureOpenAI:
+    """Build the application-wide async client on a pooled keep-alive connection pool."""
+    http_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+    return AsyncAzureOpenAI(http_client=http_client, **_client_kwargs())
+
+
+def create_client() -> AzureOpenAI:
+    """Build a sync client with the same pool settings, for scripts and sync call paths."""
+    http_client = httpx.Client(limits=_limits(), timeout=_timeout())
+    return AzureOpenAI(http_client=http_client, **_client_kwargs())
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """Content-addressed cache for resume parse results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the parser
+    version, so re-uploading the same file skips text extraction, spaCy and
+    the LLM call, and bumping a parser version invalidates old results.
+    There is an in-memory LRU tier and, when ``disk_dir`` is set, a JSON
+    file tier with a TTL and a size cap. ``get`` and ``set`` may touch the
+    disk, so async callers run them in a worker thread.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, disk_dir: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None, max_disk_bytes: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv('PARSE_CACHE_MAX_ENTRIES', '256'))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('PARSE_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv('PARSE_CACHE_MAX_DISK_MB', '100')) * 1024 * 1024
+
+        disk_dir = disk_dir or os.getenv('PARSE_CACHE_DIR')
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._disk_bytes = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(f.stat().st_size for f in self.disk_dir.glob('*/*.json'))
+
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(file_content: bytes, namespace: str, version: str) -> str:
+        """Build a cache key from the upload bytes and parser identity."""
+        digest = hashlib.sha256(file_content).hexdigest()
+        return hashlib.sha256(f"{namespace}:{version}:{digest}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value, now)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+        self._write_disk(key, value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def _remember(self, key: str, value: Any, stored_at: float) -> None:
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str, now: float) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if now - path.stat().st_mtime >= self.ttl_seconds:
+                self._remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable parse cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(exist_ok=True)
+            data = json.dumps(value).encode('utf-8')
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            # Write then rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write parse cache entry {path}: {str(e)}")
+            return
+        finally:
+            # A failed write or rename must not leave its temporary file behind
+            if tmp_path is not None:
+                self._remove(Path(tmp_path))
+
+        with self._lock:
+            self._disk_bytes += len(data) - replaced
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Drop expired entries, then the oldest ones, until under 90% of the cap."""
+        now = time.time()
+        entries = []
+        for path in self.disk_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for mtime, size, path in entries:
+            if total <= target and now - mtime < self.ttl_seconds:
+                continue
+            self._remove(path)
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
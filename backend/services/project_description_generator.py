@@ -1,81 +1,182 @@
+import asyncio
+import hashlib
 import logging
+import os
 import re
-import time
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential
 import base64
 from io import BytesIO
-from PIL import Image
-import os
-from openai import AzureOpenAI
+from PIL import Image, ImageOps
+from services.image_derivatives import flatten
+from services.llm_gateway import LLMGateway
 
 logger = logging.getLogger(__name__)
 
+# "low" bills every image at a flat 85 tokens; the model then sees it at 512px at most
+VISION_IMAGE_DETAIL = os.getenv('VISION_IMAGE_DETAIL', 'low')
+VISION_IMAGE_MAX_SIZE = int(os.getenv('VISION_IMAGE_MAX_SIZE', '512' if VISION_IMAGE_DETAIL == 'low' else '1024'))
+VISION_IMAGE_CACHE_ENTRIES = int(os.getenv('VISION_IMAGE_CACHE_ENTRIES', '64'))
+
+# Header lines the model sometimes adds despite being told not to
+DESCRIPTION_HEADERS = ('Project Title:', 'Description:', 'Title:')
+
+class HeaderStripper:
+    """Incremental version of the header cleanup in ``_clean_description``.
+
+    Text is fed as it streams in. A line is held back only while it could
+    still turn out to be a header, and header lines are dropped once their
+    newline arrives. Leading and trailing whitespace of the whole output is
+    stripped, like ``str.strip``.
+    """
+
+    def __init__(self):
+        self._line = ''
+        self._passthrough = False
+        self._started = False
+        self._pending_space = ''
+
+    def feed(self, text: str) -> str:
+        out = []
+        for char in text:
+            if self._passthrough:
+                out.append(char)
+                if char == '\n':
+                    self._passthrough = False
+                continue
+
+            self._line += char
+            if char == '\n':
+                if not self._line.startswith(DESCRIPTION_HEADERS):
+                    out.append(self._line)
+                self._line = ''
+            elif not self._line.startswith(DESCRIPTION_HEADERS) and \
+                    not any(header.startswith(self._line) for header in DESCRIPTION_HEADERS):
+                out.append(self._line)
+                self._line = ''
+                self._passthrough = True
+        return self._emit(''.join(out))
+
+    def finish(self) -> str:
+        # A header with no newline after it is kept, as the regex does
+        text, self._line = self._line, ''
+        return self._emit(text)
+
+    def _emit(self, text: str) -> str:
+        # Whitespace before the first emitted character is dropped, even
+        # when it follows a removed header line
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ''
+            self._started = True
+        # Hold trailing whitespace back until more text follows it
+        text = self._pending_space + text
+        stripped = text.rstrip()
+        self._pending_space = text[len(stripped):]
+        return stripped
+
+
 class ProjectDescriptionGenerator:
-    def __init__(self, client: AzureOpenAI):
-        self.client = client
-        self.last_request_time = 0
-        self.min_request_interval = 1  # Minimum time between requests in seconds
-
-    def _wait_for_rate_limit(self):
-        """Ensure we don't exceed rate limits"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last_request)
-        self.last_request_time = time.time()
+    def __init__(self, gateway: LLMGateway):
+        self.gateway = gateway
+        self._processed_images: "OrderedDict[str, str]" = OrderedDict()
+        self._images_lock = threading.Lock()
+
+    def _build_messages(self, prompt: str, image_url: Optional[str] = None) -> List[Dict]:
+        content = prompt
+        if image_url:
+            content = [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_url, "detail": VISION_IMAGE_DETAIL}}
+            ]
+        return [
+            {"role": "system", "content": "You are a technical writer helping to enhance project descriptions for a developer portfolio. Provide only the description text without any headers or labels."},
+            {"role": "user", "content": content}
+        ]
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
         reraise=True
     )
-    def _generate_with_openai(self, prompt: str, max_tokens: int = 200) -> str:
+    def _generate_with_openai(self, prompt: str, max_tokens: int = 200, image_url: Optional[str] = None) -> str:
         """Make API call to OpenAI with retry logic"""
-        self._wait_for_rate_limit()
-        
-        response = self.client.chat.completions.create(
-            model=os.getenv('AZURE_OPENAI_MODEL'),
-            messages=[
-                {"role": "system", "content": "You are a technical writer helping to enhance project descriptions for a developer portfolio. Provide only the description text without any headers or labels."},
-                {"role": "user", "content": prompt}
-            ],
+        content = self.gateway.complete(
+            'project_description',
+            messages=self._build_messages(prompt, image_url),
             temperature=0.7,
             max_tokens=max_tokens
         )
         
-        return response.choices[0].message.content.strip()
+        return content.strip()
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        reraise=True
+    )
+    async def _generate_with_openai_async(self, prompt: str, max_tokens: int = 200,
+                                          image_url: Optional[str] = None) -> str:
+        """Async version of ``_generate_with_openai``"""
+        content = await self.gateway.acomplete(
+            'project_description',
+            messages=self._build_messages(prompt, image_url),
+            temperature=0.7,
+            max_tokens=max_tokens
+        )
+
+        return content.strip()
 
     def _process_image_for_analysis(self, image_data: str) -> str:
-        """Process base64 image data to ensure it's in a suitable format."""
+        """Shrink a base64 image to what the vision model will look at and return it as a JPEG data URL.
+
+        JPEGs are decoded at a reduced scale, transparency is flattened onto
+        white and results are cached by the hash of the payload, so editing
+        a description does not reprocess the same image. Raises if the data
+        is not a readable image.
+        """
+        # Remove data URL prefix if present
+        if 'base64,' in image_data:
+            image_data = image_data.split('base64,', 1)[1]
+
+        key = hashlib.sha256(image_data.encode('ascii', 'replace')).hexdigest()
+        with self._images_lock:
+            cached = self._processed_images.get(key)
+            if cached is not None:
+                self._processed_images.move_to_end(key)
+                return cached
+
+        img = Image.open(BytesIO(base64.b64decode(image_data, validate=True)))
+        size = (VISION_IMAGE_MAX_SIZE, VISION_IMAGE_MAX_SIZE)
+        img.draft('RGB', size)
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(size, Image.LANCZOS, reducing_gap=3.0)
+
+        buffer = BytesIO()
+        flatten(img).save(buffer, format="JPEG", quality=85)
+        processed = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+        with self._images_lock:
+            self._processed_images[key] = processed
+            while len(self._processed_images) > VISION_IMAGE_CACHE_ENTRIES:
+                self._processed_images.popitem(last=False)
+        return processed
+
+    def _image_for_prompt(self, image: str) -> Optional[str]:
+        """Processed image to attach to the prompt, or None to describe the project from text alone."""
+        if not image or not image.startswith('data:image/'):
+            return None
         try:
-            # Remove data URL prefix if present
-            if 'base64,' in image_data:
-                image_data = image_data.split('base64,')[1]
-            
-            # Decode base64, open image and resize if too large
-            img_bytes = base64.b64decode(image_data)
-            img = Image.open(BytesIO(img_bytes))
-            
-            # Resize if image is too large (max 1024x1024)
-            max_size = 1024
-            if max(img.size) > max_size:
-                ratio = max_size / max(img.size)
-                img = img.resize((int(img.size[0] * ratio), int(img.size[1] * ratio)))
-            
-            # Convert back to base64
-            buffer = BytesIO()
-            img.save(buffer, format="JPEG")
-            return base64.b64encode(buffer.getvalue()).decode()
+            return self._process_image_for_analysis(image)
         except Exception as e:
             logger.error(f"Error processing image: {str(e)}")
-            return image_data
+            return None
 
-    def generate_description(self, title: str, image: str, brief_description: str = "", **kwargs) -> str:
-        """Generate a project description based on image and user input."""
-        try:
-            processed_image = self._process_image_for_analysis(image)
-            
-            prompt = f"""Based on this project information, provide a concise enhanced description:
+    def _build_prompt(self, title: str, brief_description: str) -> str:
+        return f"""Based on this project information, provide a concise enhanced description:
 
 Project Title: {title}
 User's Description: {brief_description}
@@ -88,12 +189,65 @@ Please provide a brief but detailed description that:
 
 Keep it concise (2-5 sentences) but technically informative."""
 
-            description = self._generate_with_openai(prompt)
-            
-            # Clean up the response by removing any title/description headers
-            description = re.sub(r'^(Project Title:|Description:|Title:).*?\n', '', description, flags=re.MULTILINE)
-            return description.strip()
+    def _clean_description(self, description: str) -> str:
+        """Remove any title/description headers from the response."""
+        description = re.sub(r'^(Project Title:|Description:|Title:).*?\n', '', description, flags=re.MULTILINE)
+        return description.strip()
+
+    def generate_description(self, title: str, image: str, brief_description: str = "", **kwargs) -> str:
+        """Generate a project description based on image and user input."""
+        try:
+            processed_image = self._image_for_prompt(image)
+            description = self._generate_with_openai(self._build_prompt(title, brief_description), image_url=processed_image)
+            return self._clean_description(description)
 
         except Exception as e:
             logger.error(f"Error generating description: {str(e)}")
-            return brief_description  # Return original description if generation fails 
\ No newline at end of file
+            return brief_description  # Return original description if generation fails
+
+    async def generate_description_async(self, title: str, image: str, brief_description: str = "", **kwargs) -> str:
+        """Async version of ``generate_description``."""
+        try:
+            processed_image = await asyncio.to_thread(self._image_for_prompt, image)
+            description = await self._generate_with_openai_async(self._build_prompt(title, brief_description),
+                                                                 image_url=processed_image)
+            return self._clean_description(description)
+
+        except Exception as e:
+            logger.error(f"Error generating description: {str(e)}")
+            return brief_description  # Return original description if generation fails
+
+    async def stream_description(self, title: str, image: str, brief_description: str = "",
+                                 max_tokens: int = 200, max_attempts: int = 3, **kwargs) -> AsyncIterator[Dict]:
+        """Stream a project description as it is generated.
+
+        Yields ``{"delta": text}`` events with headers already stripped, then
+        one final ``{"description": text, "fallback": bool}`` event. Failures
+        before the first token are retried quickly; any other failure falls
+        back to the brief description.
+        """
+        processed_image = await asyncio.to_thread(self._image_for_prompt, image)
+        messages = self._build_messages(self._build_prompt(title, brief_description), processed_image)
+
+        for attempt in range(max_attempts):
+            stripper = HeaderStripper()
+            parts = []
+            try:
+                async for delta in self.gateway.astream('project_description', messages, temperature=0.7, max_tokens=max_tokens):
+                    cleaned = stripper.feed(delta)
+                    if cleaned:
+                        parts.append(cleaned)
+                        yield {'delta': cleaned}
+                tail = stripper.finish()
+                if tail:
+                    parts.append(tail)
+                    yield {'delta': tail}
+                yield {'description': ''.join(parts), 'fallback': False}
+                return
+            except Exception as e:
+                logger.error(f"Error streaming description (attempt {attempt + 1}): {str(e)}")
+                if parts or attempt + 1 == max_attempts:
+                    break
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+        yield {'description': brief_description, 'fallback': True}
@@ -1,16 +1,19 @@
+import asyncio
 import logging
-from typing import Dict
+from typing import Dict, List
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 import re
-from openai import AzureOpenAI
+from services.llm_gateway import LLMGateway
+from services.github_client import GitHubFetchError, get_github_client
+from services.github_graphql import get_graphql_client
 
 logger = logging.getLogger(__name__)
 
 class ProjectGenerator:
-    def __init__(self, client: AzureOpenAI):
-        self.client = client
+    def __init__(self, gateway: LLMGateway):
+        self.gateway = gateway
 
     def _extract_github_info(self, github_url: str) -> Dict:
         """Extract information from GitHub repository."""
@@ -19,14 +22,32 @@ class ProjectGenerator:
             path = urlparse(github_url).path
             owner, repo = path.strip('/').split('/')[-2:]
             
-            # Use GitHub API
-            api_url = f"https://api.github.com/repos/{owner}/{repo}"
-            response = requests.get(api_url)
+            graphql = get_graphql_client()
+            if graphql.available():
+                # From the owner's listing when the import fetched it, else one query
+                try:
+                    data = graphql.get_repository(owner, repo)
+                except GitHubFetchError as e:
+                    logger.warning(f"Falling back to the REST API: {str(e)}")
+                    data = None
+                if data:
+                    return {
+                        'description': data.get('description') or '',
+                        'languages': list(data['languages']),
+                        'topics': data['topics'],
+                        'stars': data['stargazers_count'],
+                        'forks': data['forks_count']
+                    }
+
+            client = get_github_client()
+            response = client.get(f"repos/{owner}/{repo}")
             if response.ok:
-                data = response.json()
+                data = response.data
+                # languages_url is an endpoint returning {language: bytes}
+                languages = client.get_json(data['languages_url']) if data.get('languages_url') else None
                 return {
                     'description': data.get('description', ''),
-                    'languages': list(data.get('languages_url', {}).keys()),
+                    'languages': list(languages or {}),
                     'stars': data.get('stargazers_count', 0),
                     'forks': data.get('forks_count', 0)
                 }
@@ -46,11 +67,10 @@ class ProjectGenerator:
             logger.error(f"Error extracting YouTube info: {str(e)}")
         return ''
 
-    def generate_description(self, project_data: Dict) -> Dict:
-        """Generate project description using available information."""
+    def _collect_context(self, project_data: Dict) -> List[str]:
+        """Collect information about the project from its links."""
         context = []
 
-        # Collect information from different sources
         if project_data.get('github'):
             github_info = self._extract_github_info(project_data['github'])
             if github_info:
@@ -61,7 +81,9 @@ class ProjectGenerator:
             if youtube_info:
                 context.append(f"Project demo information: {youtube_info}")
 
-        # Generate prompt
+        return context
+
+    def _build_messages(self, project_data: Dict, context: List[str]) -> List[Dict]:
         prompt = f"""Generate a detailed project description for a portfolio website. Use the following information:
 
 Project Title: {project_data['title']}
@@ -78,27 +100,45 @@ Please provide:
 1. A comprehensive project description
 2. A list of technologies used (extracted or inferred)
 """
+        return [
+            {"role": "system", "content": "You are a technical writer helping to create portfolio project descriptions."},
+            {"role": "user", "content": prompt}
+        ]
 
+    def _parse_response(self, content: str) -> Dict:
+        description_match = re.search(r'Description:(.*?)(?=Technologies|$)', content, re.DOTALL)
+        technologies_match = re.search(r'Technologies:(.*?)$', content, re.DOTALL)
+        
+        return {
+            'description': description_match.group(1).strip() if description_match else content,
+            'technologies': technologies_match.group(1).strip() if technologies_match else ''
+        }
+
+    def generate_description(self, project_data: Dict) -> Dict:
+        """Generate project description using available information."""
+        context = self._collect_context(project_data)
         try:
-            response = self.client.chat.completions.create(
-                model=os.getenv('AZURE_OPENAI_MODEL'),
-                messages=[
-                    {"role": "system", "content": "You are a technical writer helping to create portfolio project descriptions."},
-                    {"role": "user", "content": prompt}
-                ],
+            content = self.gateway.complete(
+                'project_generator',
+                messages=self._build_messages(project_data, context),
                 temperature=0.7,
             )
-            
-            # Parse the response
-            content = response.choices[0].message.content
-            description_match = re.search(r'Description:(.*?)(?=Technologies|$)', content, re.DOTALL)
-            technologies_match = re.search(r'Technologies:(.*?)$', content, re.DOTALL)
-            
-            return {
-                'description': description_match.group(1).strip() if description_match else content,
-                'technologies': technologies_match.group(1).strip() if technologies_match else ''
-            }
+            return self._parse_response(content)
+        except Exception as e:
+            logger.error(f"Error generating project description: {str(e)}")
+            raise
 
+    async def generate_description_async(self, project_data: Dict) -> Dict:
+        """Async version of ``generate_description``."""
+        # Link scraping still uses blocking requests, so keep it off the loop
+        context = await asyncio.to_thread(self._collect_context, project_data)
+        try:
+            content = await self.gateway.acomplete(
+                'project_generator',
+                messages=self._build_messages(project_data, context),
+                temperature=0.7,
+            )
+            return self._parse_response(content)
         except Exception as e:
             logger.error(f"Error generating project description: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
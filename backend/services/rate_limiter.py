@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (request tokens, LLM tokens, last refill timestamp)
+Levels = Tuple[float, float, float]
+
+
+class _MemoryBucketState:
+    """Bucket levels held in this process only."""
+
+    # Transactions only wait on other threads of this process, briefly
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._levels: Optional[Levels] = None
+
+    def transact(self, fn: Callable):
+        with self._lock:
+            self._levels, result = fn(self._levels)
+            return result
+
+
+class _FileBucketState:
+    """Bucket levels in a small file, shared by every process on the host.
+
+    Each transaction holds an exclusive ``flock`` on the file while it reads,
+    updates and writes the three levels back.
+    """
+
+    # Transactions can wait on another process holding the lock
+    blocking = True
+
+    _FORMAT = '3d'
+    _SIZE = struct.calcsize(_FORMAT)
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    def _file(self) -> int:
+        # Re-open after fork so processes never share one open file description
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def transact(self, fn: Callable):
+        import fcntl
+
+        with self._lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, self._SIZE, 0)
+                levels = struct.unpack(self._FORMAT, raw) if len(raw) == self._SIZE else None
+                new_levels, result = fn(levels)
+                os.pwrite(fd, struct.pack(self._FORMAT, *new_levels), 0)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class TokenBucketLimiter:
+    """Token-bucket limiter that budgets requests/min and tokens/min together.
+
+    A call may proceed once both buckets hold enough. Buckets refill
+    continuously, so bursts up to the quota go through immediately instead
+    of being spaced at a fixed rate.
+
+    If ``shared_file`` is set, the levels live in that file, so all uvicorn
+    workers on the host draw from one quota. The async methods then update
+    it from a worker thread, as waiting for the file lock would stall the
+    event loop.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 shared_file: Optional[str] = None, max_sleep: float = 1.0):
+        self.requests_per_minute = requests_per_minute or float(os.getenv('LLM_REQUESTS_PER_MINUTE', '120'))
+        self.tokens_per_minute = tokens_per_minute or float(os.getenv('LLM_TOKENS_PER_MINUTE', '20000'))
+        self.max_sleep = max_sleep
+
+        shared_file = shared_file or os.getenv('LLM_RATE_LIMIT_FILE')
+        self._state = _FileBucketState(shared_file) if shared_file else _MemoryBucketState()
+
+    def _refill(self, levels: Optional[Levels], now: float) -> Tuple[float, float]:
+        if levels is None:
+            return self.requests_per_minute, self.tokens_per_minute
+        requests, tokens, updated_at = levels
+        elapsed = max(now - updated_at, 0.0)
+        return (
+            min(self.requests_per_minute, requests + elapsed * self.requests_per_minute / 60),
+            min(self.tokens_per_minute, tokens + elapsed * self.tokens_per_minute / 60),
+        )
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take one request and ``tokens`` tokens if available.
+
+        Returns 0 on success, otherwise the estimated seconds until enough
+        capacity will have refilled.
+        """
+        # A call larger than the whole bucket could never run, so cap it
+        tokens = min(tokens, self.tokens_per_minute)
+
+        def take(levels):
+            now = time.time()
+            requests, available = self._refill(levels, now)
+            if requests >= 1 and available >= tokens:
+                return (requests - 1, available - tokens, now), 0.0
+            wait = max(
+                (1 - requests) * 60 / self.requests_per_minute,
+                (tokens - available) * 60 / self.tokens_per_minute,
+                0.01,
+            )
+            return (requests, available, now), wait
+
+        return self._state.transact(take)
+
+    async def _off_loop(self, fn: Callable, *args):
+        if self._state.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait, without blocking the event loop, until the call fits the quota."""
+        while True:
+            wait = await self._off_loop(self._try_acquire, tokens)
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, self.max_sleep))
+
+    def acquire_blocking(self, tokens: int) -> None:
+        """Thread-blocking version of ``acquire`` for sync call paths."""
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(min(wait, self.max_sleep))
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once a call reports its real usage."""
+        difference = min(estimated_tokens, self.tokens_per_minute) - actual_tokens
+        if not difference:
+            return
+
+        def adjust(levels):
+            now = time.time()
+            requests, available = self._refill(levels, now)
+            return (requests, min(self.tokens_per_minute, available + difference), now), None
+
+        self._state.transact(adjust)
+
+    async def areconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Async version of ``reconcile``."""
+        await self._off_loop(self.reconcile, estimated_tokens, actual_tokens)
@@ -0,0 +1,148 @@
+import io
+import logging
+import re
+from functools import cached_property
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple
+
+import PyPDF2
+import docx
+
+logger = logging.getLogger(__name__)
+
+# Common section headers
+SECTION_HEADERS = {
+    'skills': r'(?:technical\s+)?skills?|technologies|competencies|expertise',
+    'experience': r'experience|employment(?:\s+history)?|work\s+history|work\s+experience',
+    'projects': r'projects?|portfolio|works',
+    'education': r'education|academic|qualifications?',
+    'summary': r'(?:professional\s+)?summary|objective|profile|about(?:\s+me)?',
+}
+
+# One anchored pattern for all headers: a header fills its line, optionally
+# followed by a colon and inline content ("Skills: Python, SQL").
+_HEADER_PATTERN = re.compile(
+    r'^[ \t]*(?:' + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in SECTION_HEADERS.items()) + r')[ \t]*(?::|$)',
+    re.IGNORECASE | re.MULTILINE
+)
+_INLINE_SPACE = re.compile(r'[^\S\n]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def segment_sections(text: str) -> Dict[str, Tuple[int, int]]:
+    """Split text into sections in one pass over its header lines.
+
+    Returns ``(start, end)`` offsets into ``text`` for each section's body
+    rather than copies. Text before the first header is the 'unknown'
+    section; if a header repeats, the last occurrence wins.
+    """
+    spans = {}
+    current_section = 'unknown'
+    body_start = 0
+
+    for match in _HEADER_PATTERN.finditer(text):
+        _add_span(spans, text, current_section, body_start, match.start())
+        current_section = match.lastgroup
+        body_start = match.end()
+
+    _add_span(spans, text, current_section, body_start, len(text))
+    return spans
+
+
+def _add_span(spans: Dict[str, Tuple[int, int]], text: str, section: str, start: int, end: int) -> None:
+    # Trim surrounding whitespace by moving the offsets, not by copying
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        spans[section] = (start, end)
+
+
+class SectionView(Mapping):
+    """Read-only mapping of section name to text, sliced on access."""
+
+    def __init__(self, text: str, spans: Dict[str, Tuple[int, int]]):
+        self.text = text
+        self.spans = spans
+
+    def __getitem__(self, section: str) -> str:
+        start, end = self.spans[section]
+        return self.text[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+
+class ResumeDocument:
+    """An uploaded resume, decoded once and shared between parsers.
+
+    Text extraction and sectioning are computed on first access and cached,
+    so the heuristic and AI parsers can both read from the same instance.
+    """
+
+    def __init__(self, file_content, file_type: str):
+        # Accept raw bytes or a file-like object, as the parsers always have
+        if hasattr(file_content, 'read'):
+            file_content = file_content.read()
+        self.file_content = file_content
+        self.file_type = file_type
+
+    @cached_property
+    def pages(self) -> List[str]:
+        """Text of each PDF page, or the whole DOCX body as a single page."""
+        try:
+            if self.file_type == 'pdf':
+                pdf_reader = PyPDF2.PdfReader(io.BytesIO(self.file_content))
+                return [page.extract_text() or '' for page in pdf_reader.pages]
+            elif self.file_type == 'docx':
+                doc = docx.Document(io.BytesIO(self.file_content))
+                return ["\n".join(paragraph.text for paragraph in doc.paragraphs)]
+            raise ValueError(f"Unsupported file type: {self.file_type}")
+        except Exception as e:
+            logger.error(f"Error extracting text from {self.file_type}: {str(e)}")
+            raise
+
+    @cached_property
+    def text(self) -> str:
+        return '\n'.join(self.pages)
+
+    @cached_property
+    def clean_text(self) -> str:
+        """Text with whitespace normalized inside lines but line breaks kept.
+
+        Runs of blank lines are reduced to one, so entries separated by a
+        blank line stay separable.
+        """
+        lines = (_INLINE_SPACE.sub(' ', line).strip() for line in self.text.splitlines())
+        return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+    @cached_property
+    def section_spans(self) -> Dict[str, Tuple[int, int]]:
+        """Offsets of each section body within ``clean_text``."""
+        return segment_sections(self.clean_text)
+
+    @property
+    def sections(self) -> SectionView:
+        return SectionView(self.clean_text, self.section_spans)
+
+    def load(self) -> 'ResumeDocument':
+        """Decode the upload and compute every cached view up front."""
+        self.section_spans
+        return self
+
+    def __getstate__(self):
+        # Once decoded, the raw upload is dead weight when shipping the
+        # document to a worker process.
+        state = self.__dict__.copy()
+        if 'pages' in state:
+            state['file_content'] = None
+        return state
+
+
+def load_resume_document(file_content: bytes, file_type: str) -> ResumeDocument:
+    """Decode a resume upload. Picklable entry point for worker processes."""
+    return ResumeDocument(file_content, file_type).load()
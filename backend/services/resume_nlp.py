@@ -0,0 +1,55 @@
+import logging
+import os
+import threading
+from typing import Iterable, Iterator, Optional
+
+import spacy
+from spacy.tokens import Doc
+
+logger = logging.getLogger(__name__)
+
+
+class ResumeNLP:
+    """Lazily loaded spaCy pipeline trimmed to what resume parsing uses.
+
+    Only the tokenizer and NER run; the tagger, parser and lemmatizer are
+    excluded at load time so they are never even deserialized. The NER in
+    the ``en_core_web_*`` models carries its own tok2vec, so it does not
+    need the shared one.
+    """
+
+    EXCLUDED_COMPONENTS = ['tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter']
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: int = 16):
+        self.model_name = model_name or os.getenv('SPACY_MODEL', 'en_core_web_sm')
+        self.batch_size = batch_size
+        self._nlp = None
+        self._lock = threading.Lock()
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    self._nlp = self._load()
+        return self._nlp
+
+    def _load(self):
+        try:
+            nlp = spacy.load(self.model_name, exclude=self.EXCLUDED_COMPONENTS)
+        except OSError:
+            logger.error(
+                f"spaCy model '{self.model_name}' is not installed; "
+                f"run `python -m spacy download {self.model_name}` at build time"
+            )
+            raise
+        logger.info(f"Loaded spaCy model '{self.model_name}' with pipes {nlp.pipe_names}")
+        return nlp
+
+    def analyze(self, text: str) -> Doc:
+        """Run the pipeline over one document."""
+        return self.nlp(text)
+
+    def pipe(self, texts: Iterable[str], batch_size: Optional[int] = None) -> Iterator[Doc]:
+        """Run the pipeline over many documents in batches."""
+        return self.nlp.pipe(texts, batch_size=batch_size or self.batch_size)
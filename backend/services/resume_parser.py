@@ -1,83 +1,33 @@
-import PyPDF2
-import docx
 import logging
 import re
-import spacy
-from typing import Dict, List
+from spacy.tokens import Doc
+from typing import Dict, List, Optional
 from datetime import datetime
 from dateutil import parser as date_parser
+from services.resume_document import ResumeDocument
+from services.resume_nlp import ResumeNLP
+from services.skill_matcher import SkillMatcher, get_skill_matcher
 
 logger = logging.getLogger(__name__)
 
+# Bump when a change alters parse output, to invalidate cached results
+PARSER_VERSION = '2'
+
 class ResumeParser:
-    def __init__(self):
+    def __init__(self, nlp: Optional[ResumeNLP] = None, skill_matcher: Optional[SkillMatcher] = None):
         self.supported_formats = ['.pdf', '.docx']
-        # Load English language model for NER
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except:
-            # Download if not available
-            import subprocess
-            subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-            self.nlp = spacy.load("en_core_web_sm")
-
-        # Common section headers
-        self.section_headers = {
-            'skills': r'(?i)(technical\s+)?skills?|technologies|competencies|expertise',
-            'experience': r'(?i)experience|employment( history)?|work history|work experience',
-            'projects': r'(?i)projects?|portfolio|works',
-            'education': r'(?i)education|academic|qualification',
-            'summary': r'(?i)summary|objective|profile|about',
-        }
+        # English NER pipeline, loaded on first use
+        self.nlp = nlp or ResumeNLP()
+        # Known programming languages and technologies
+        self.skill_matcher = skill_matcher or get_skill_matcher()
 
-        # Common programming languages and technologies
-        self.tech_keywords = set([
-            'python', 'java', 'javascript', 'js', 'typescript', 'ts', 'c++', 'c#',
-            'react', 'angular', 'vue', 'node', 'express', 'django', 'flask',
-            'sql', 'mongodb', 'postgresql', 'mysql', 'redis', 'aws', 'azure',
-            'docker', 'kubernetes', 'git', 'ci/cd', 'rest', 'graphql',
-            'html', 'css', 'sass', 'less', 'webpack', 'babel', 'jquery',
-            'machine learning', 'ai', 'artificial intelligence', 'data science',
-            'tensorflow', 'pytorch', 'keras', 'opencv', 'nlp'
-        ])
-
-    def _extract_sections(self, text: str) -> Dict[str, str]:
-        """Extract different sections from the text using regex patterns."""
-        sections = {}
-        lines = text.split('\n')
-        current_section = 'unknown'
-        section_content = []
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
+    def _header(self, text: str) -> str:
+        """The first lines of the resume, where the name usually is."""
+        return ' '.join(text.split('\n')[:3])
 
-            # Check if line is a section header
-            is_header = False
-            for section, pattern in self.section_headers.items():
-                if re.match(pattern, line, re.IGNORECASE):
-                    if section_content:
-                        sections[current_section] = '\n'.join(section_content)
-                    current_section = section
-                    section_content = []
-                    is_header = True
-                    break
-
-            if not is_header:
-                section_content.append(line)
-
-        # Add the last section
-        if section_content:
-            sections[current_section] = '\n'.join(section_content)
-
-        return sections
-
-    def _extract_name(self, text: str) -> str:
-        """Extract name using NER and heuristics."""
-        # Try to find name at the beginning of the resume
+    def _extract_name(self, text: str, doc: Doc) -> str:
+        """Extract name using NER over the header and heuristics."""
         first_lines = text.split('\n')[:3]
-        doc = self.nlp(' '.join(first_lines))
         
         # Look for PERSON entities
         for ent in doc.ents:
@@ -92,7 +42,7 @@ class ResumeParser:
         return ''
 
     def _extract_skills(self, text: str, sections: Dict[str, str]) -> List[str]:
-        """Extract skills using keyword matching and NLP."""
+        """Extract skills using the skills section and keyword matching."""
         skills = set()
         
         # Look in skills section first
@@ -104,17 +54,15 @@ class ResumeParser:
             for skill in skill_candidates:
                 skill = skill.strip().lower()
                 # Match against known technologies
-                if skill in self.tech_keywords:
-                    skills.add(skill)
+                canonical = self.skill_matcher.canonical(skill)
+                if canonical:
+                    skills.add(canonical)
                 # Look for technology patterns
                 elif re.search(r'\b[A-Za-z]+(?:\+\+|#|\.js|\.NET)?\b', skill):
                     skills.add(skill)
 
         # Look for skills in other sections
-        doc = self.nlp(text)
-        for token in doc:
-            if token.text.lower() in self.tech_keywords:
-                skills.add(token.text.lower())
+        skills.update(self.skill_matcher.find_all(text))
 
         return list(skills)
 
@@ -176,11 +124,7 @@ class ResumeParser:
             project['title'] = lines[0].strip()
 
             # Look for technologies used
-            tech_used = []
-            for line in lines:
-                for tech in self.tech_keywords:
-                    if tech in line.lower():
-                        tech_used.append(tech)
+            tech_used = self.skill_matcher.find_all(entry)
             
             if tech_used:
                 project['technologies'] = ', '.join(tech_used)
@@ -193,15 +137,17 @@ class ResumeParser:
 
         return projects
 
-    def _extract_information(self, text: str) -> Dict:
-        # Clean the text
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Extract sections
-        sections = self._extract_sections(text)
+    def _extract_information(self, document: ResumeDocument, doc: Optional[Doc] = None) -> Dict:
+        # Use the cleaned text and sections cached on the document
+        text = document.clean_text
+        sections = document.sections
+
+        # Only name extraction needs NER, so only the header goes through spaCy
+        if doc is None:
+            doc = self.nlp.analyze(self._header(text))
         
         # Extract information
-        name = self._extract_name(text)
+        name = self._extract_name(text, doc)
         skills = self._extract_skills(text, sections)
         experiences = self._extract_experience(sections)
         projects = self._extract_projects(sections)
@@ -287,22 +233,42 @@ class ResumeParser:
         
         return interests
 
+    def parse_document(self, document: ResumeDocument) -> Dict:
+        """Extract information from an already decoded resume."""
+        return self._extract_information(document)
+
+    def parse_documents(self, documents: List[ResumeDocument]) -> List[Dict]:
+        """Extract information from many resumes, batching the NLP pipeline."""
+        docs = self.nlp.pipe(self._header(document.clean_text) for document in documents)
+        return [
+            self._extract_information(document, doc)
+            for document, doc in zip(documents, docs)
+        ]
+
     def parse_pdf(self, file_content: bytes) -> Dict:
         try:
-            pdf_reader = PyPDF2.PdfReader(file_content)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return self._extract_information(text)
+            return self._extract_information(ResumeDocument(file_content, 'pdf'))
         except Exception as e:
             logger.error(f"Error parsing PDF: {str(e)}")
             raise
 
     def parse_docx(self, file_content: bytes) -> Dict:
         try:
-            doc = docx.Document(file_content)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return self._extract_information(text)
+            return self._extract_information(ResumeDocument(file_content, 'docx'))
         except Exception as e:
             logger.error(f"Error parsing DOCX: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+
+_worker_parser = None
+
+def _get_worker_parser() -> ResumeParser:
+    """Return this process's ResumeParser, creating it on first use."""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = ResumeParser()
+    return _worker_parser
+
+def parse_resume_document(document: ResumeDocument) -> Dict:
+    """Parse a decoded resume. Picklable entry point for worker processes."""
+    return _get_worker_parser().parse_document(document)
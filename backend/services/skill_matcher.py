@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SKILLS_FILE = Path(__file__).resolve().parent.parent / 'data' / 'skills.json'
+
+# Characters that continue a skill term, e.g. the '+' in 'c++'
+_BOUNDARY = r'\w+#'
+
+
+def _normalize(term: str) -> str:
+    return ' '.join(term.lower().split())
+
+
+def _build_trie(terms: List[str]) -> Dict:
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return trie
+
+
+def _trie_to_pattern(node: Dict) -> str:
+    """Turn a character trie into a regex with shared prefixes factored out.
+
+    Factoring keeps the regex engine from retrying every term at each
+    position, so scan cost stays flat as the dictionary grows.
+    """
+    alternatives = []
+    optional = False
+    for char in sorted(node):
+        if char == '':
+            optional = True
+            continue
+        char_pattern = r'\s+' if char == ' ' else re.escape(char)
+        alternatives.append(char_pattern + _trie_to_pattern(node[char]))
+
+    if not alternatives:
+        return ''
+    pattern = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    if optional:
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+
+class SkillMatcher:
+    """Finds known skills in text with one precompiled regex.
+
+    ``skills`` maps each canonical skill name to a list of aliases. Matches
+    respect word boundaries, so 'ai' does not match inside 'maintain', and
+    aliases are reported under their canonical name (js -> javascript).
+    """
+
+    def __init__(self, skills: Dict[str, List[str]]):
+        self.aliases: Dict[str, str] = {}
+        for canonical, aliases in skills.items():
+            canonical = _normalize(canonical)
+            self.aliases[canonical] = canonical
+            for alias in aliases:
+                self.aliases[_normalize(alias)] = canonical
+
+        body = _trie_to_pattern(_build_trie(list(self.aliases)))
+        self.pattern = re.compile(
+            rf'(?<![{_BOUNDARY}])(?:{body})(?![{_BOUNDARY}])',
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> 'SkillMatcher':
+        """Load a skill dictionary from a JSON file of ``{skill: [aliases]}``."""
+        path = path or os.getenv('SKILLS_FILE') or DEFAULT_SKILLS_FILE
+        with open(path, encoding='utf-8') as f:
+            skills = json.load(f)
+        logger.info(f"Loaded {len(skills)} skills from {path}")
+        return cls(skills)
+
+    def canonical(self, term: str) -> Optional[str]:
+        """Return the canonical name of a term if it is a known skill."""
+        return self.aliases.get(_normalize(term))
+
+    def find_all(self, text: str) -> List[str]:
+        """Return the canonical skills found in text, in order of first use."""
+        found = {}
+        for match in self.pattern.finditer(text):
+            found.setdefault(self.aliases[_normalize(match.group(0))], None)
+        return list(found)
+
+
+_default_matcher = None
+
+def get_skill_matcher() -> SkillMatcher:
+    """Return the shared matcher built from the default skill dictionary."""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = SkillMatcher.from_file()
+    return _default_matcher
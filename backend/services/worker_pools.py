@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already holds as much work as its queue allows."""
+
+    def __init__(self, pool_name: str, retry_after: int = 1):
+        super().__init__(f"The {pool_name} worker pool is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Wraps an executor with a limit on running plus queued jobs.
+
+    The pending counter is only touched from the event loop thread, so it
+    needs no lock.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_pending: int):
+        self.name = name
+        self.executor = executor
+        self.max_pending = max_pending
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        if self._pending >= self.max_pending:
+            logger.warning(f"Rejecting work for {self.name} pool ({self._pending} pending)")
+            raise PoolSaturatedError(self.name)
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+class WorkerPools:
+    """Execution layer for blocking work called from async endpoints.
+
+    Blocking I/O (HTTP APIs, LLM calls) goes to a thread pool, CPU-heavy work
+    (PDF decoding, spaCy) goes to a process pool. Sizes and queue depths come
+    from the environment unless passed explicitly.
+    """
+
+    def __init__(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+                 io_queue_depth: Optional[int] = None, cpu_queue_depth: Optional[int] = None):
+        io_workers = io_workers or int(os.getenv('IO_POOL_WORKERS', '16'))
+        cpu_workers = cpu_workers or int(os.getenv('CPU_POOL_WORKERS', str(os.cpu_count() or 1)))
+        io_queue_depth = io_queue_depth if io_queue_depth is not None else int(os.getenv('IO_POOL_QUEUE_DEPTH', '64'))
+        cpu_queue_depth = cpu_queue_depth if cpu_queue_depth is not None else int(os.getenv('CPU_POOL_QUEUE_DEPTH', '8'))
+
+        self.io = BoundedExecutor(
+            'io',
+            ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='io-pool'),
+            io_workers + io_queue_depth,
+        )
+        self.cpu = BoundedExecutor(
+            'cpu',
+            ProcessPoolExecutor(max_workers=cpu_workers),
+            cpu_workers + cpu_queue_depth,
+        )
+
+    async def run_io(self, fn: Callable, *args, **kwargs):
+        """Run a blocking I/O-bound callable in the thread pool."""
+        return await self.io.run(fn, *args, **kwargs)
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs):
+        """Run a CPU-bound callable in the process pool.
+
+        ``fn`` and its arguments must be picklable, so pass module-level
+        functions rather than bound methods of app-level objects.
+        """
+        return await self.cpu.run(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        self.io.shutdown()
+        self.cpu.shutdown()
@@ -1,22 +1,323 @@
-import json
+import hashlib
+import logging
 import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from itertools import chain
 from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import brotli
+
+logger = logging.getLogger(__name__)
+
+# Slugs are slugify() output plus a uuid fragment; anything else is rejected.
+# Names that slugify to nothing were deployed as "-<fragment>", so a leading
+# hyphen stays valid.
+SLUG_PATTERN = re.compile(r'^[a-z0-9-]+$')
+
+IDENTITY = 'identity'
+
+BROTLI_QUALITY = int(os.getenv('PORTFOLIO_BROTLI_QUALITY', '9'))
+
+# Large files are hashed and compressed in chunks of this size
+FILE_CHUNK_SIZE = 1024 * 1024
+
+# Bookkeeping cost charged to the cache for every entry, on top of its bodies
+ENTRY_OVERHEAD = 512
+
+
+class _BrotliCompressor:
+    """Gives brotli's streaming compressor the zlib compressobj interface."""
 
-class PortfolioStorage:
     def __init__(self):
-        self.storage_dir = Path("portfolios")
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+# Content-Encoding -> (file extension, streaming compressor factory)
+COMPRESSORS = {
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    'gzip': ('gz', lambda: zlib.compressobj(9, zlib.DEFLATED, 31)),
+    'br': ('br', _BrotliCompressor),
+}
+
+
+def content_digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def file_digest(path: Path) -> str:
+    """``content_digest`` of a file, read in chunks."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(FILE_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:32]
+
+
+class StoredPortfolio:
+    """A deployed portfolio page and its precompressed variants.
+
+    ``files`` maps each available Content-Encoding (``identity``, ``gzip``,
+    ``br``) to the file holding it. ``bodies`` holds the same bytes in
+    memory for pages small enough to cache. It is empty for large pages,
+    which are streamed from ``files`` instead. All variants share one
+    content ``digest``.
+    """
+
+    def __init__(self, files: Dict[str, Path], bodies: Dict[str, bytes], digest: str, mtime_ns: int):
+        self.files = files
+        self.bodies = bodies
+        self.digest = digest
+        self.mtime_ns = mtime_ns
+        self.checked_at = time.monotonic()
+
+    @property
+    def path(self) -> Path:
+        return self.files[IDENTITY]
+
+    @property
+    def streamed(self) -> bool:
+        return not self.bodies
+
+    @property
+    def body(self) -> bytes:
+        if IDENTITY in self.bodies:
+            return self.bodies[IDENTITY]
+        return self.path.read_bytes()
+
+    @property
+    def size(self) -> int:
+        return ENTRY_OVERHEAD + sum(len(body) for body in self.bodies.values())
+
+
+class PortfolioStorage:
+    """Deployed portfolios on disk, fronted by an in-memory LRU of encoded pages.
+
+    Pages live at ``portfolios/<slug[:2]>/<slug>.html`` so no directory grows
+    without bound. Pages saved before sharding, at ``portfolios/<slug>.html``,
+    are still served. Saves write a temporary file and rename it into place,
+    so readers never see a partial page.
+
+    Every save also stores gzip and brotli variants next to
+    the page as ``<slug>.<digest>.gz`` / ``.br``, so serving never compresses.
+    Naming them by content digest means a variant can never be paired with
+    a different version of the page.
+
+    The cache holds at most ``cache_bytes`` of pages. A cached page is
+    re-checked against its file's mtime every ``revalidate_seconds``. That
+    picks up redeploys done by other worker processes. Pages larger than
+    ``stream_threshold`` bytes are never read into memory. Only their
+    digest and file paths are cached, and they are served by streaming the
+    files.
+    """
+
+    def __init__(self, storage_dir: Optional[str] = None, cache_bytes: Optional[int] = None,
+                 revalidate_seconds: Optional[float] = None, stream_threshold: Optional[int] = None):
+        self.storage_dir = Path(storage_dir or os.getenv('PORTFOLIO_DIR', 'portfolios'))
         self.storage_dir.mkdir(exist_ok=True)
-        
+        self.cache_bytes = cache_bytes or int(os.getenv('PORTFOLIO_CACHE_MB', '64')) * 1024 * 1024
+        self.revalidate_seconds = (
+            revalidate_seconds if revalidate_seconds is not None
+            else float(os.getenv('PORTFOLIO_CACHE_REVALIDATE_SECONDS', '5'))
+        )
+        self.stream_threshold = stream_threshold or int(os.getenv('PORTFOLIO_STREAM_THRESHOLD_KB', '1024')) * 1024
+        self._cache: "OrderedDict[str, StoredPortfolio]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, slug: str) -> Path:
+        return self.storage_dir / slug[:2] / f"{slug}.html"
+
+    def _legacy_path(self, slug: str) -> Path:
+        return self.storage_dir / f"{slug}.html"
+
+    def _cache_put(self, slug: str, entry: StoredPortfolio) -> None:
+        with self._lock:
+            self._cache_drop(slug)
+            # A page that would flush most of the cache is served from disk instead
+            if entry.size > self.cache_bytes // 4:
+                return
+            self._cache[slug] = entry
+            self._cached_bytes += entry.size
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted.size
+
+    def _cache_drop(self, slug: str) -> None:
+        # Caller holds the lock
+        entry = self._cache.pop(slug, None)
+        if entry is not None:
+            self._cached_bytes -= entry.size
+
+    def _cache_get(self, slug: str) -> Optional[StoredPortfolio]:
+        with self._lock:
+            entry = self._cache.get(slug)
+            if entry is None:
+                return None
+            self._cache.move_to_end(slug)
+        if time.monotonic() - entry.checked_at < self.revalidate_seconds:
+            return entry
+        try:
+            if os.stat(entry.path).st_mtime_ns == entry.mtime_ns:
+                entry.checked_at = time.monotonic()
+                return entry
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            if self._cache.get(slug) is entry:
+                self._cache_drop(slug)
+        return None
+
+    def invalidate(self, slug: str) -> None:
+        """Forget the cached copy of a portfolio, e.g. after its files changed underneath it"""
+        with self._lock:
+            self._cache_drop(slug)
+
+    @staticmethod
+    def _write_atomic(path: Path, body: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _compress_file_atomic(source: Path, path: Path, compressor) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with open(source, 'rb') as src, os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: src.read(FILE_CHUNK_SIZE), b''):
+                    f.write(compressor.compress(chunk))
+                f.write(compressor.flush())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _variant_path(path: Path, digest: str, extension: str) -> Path:
+        return path.with_name(f"{path.stem}.{digest}.{extension}")
+
+    def _variants(self, path: Path, digest: str, body: Optional[bytes] = None) -> StoredPortfolio:
+        """Collect a page and its compressed variants, creating any that are missing.
+
+        ``body`` is the page when the caller already holds it. Otherwise
+        missing variants are compressed straight from the file in chunks.
+        Variant bodies are only kept in memory when the page is below the
+        streaming threshold.
+        """
+        files = {IDENTITY: path}
+        in_memory = body is not None and len(body) <= self.stream_threshold
+        bodies = {IDENTITY: body} if in_memory else {}
+
+        for encoding, (extension, new_compressor) in COMPRESSORS.items():
+            variant_path = self._variant_path(path, digest, extension)
+            try:
+                if variant_path.exists():
+                    if in_memory:
+                        bodies[encoding] = variant_path.read_bytes()
+                elif body is not None:
+                    compressor = new_compressor()
+                    compressed = compressor.compress(body) + compressor.flush()
+                    self._write_atomic(variant_path, compressed)
+                    if in_memory:
+                        bodies[encoding] = compressed
+                else:
+                    self._compress_file_atomic(path, variant_path, new_compressor())
+                files[encoding] = variant_path
+            except Exception as e:
+                logger.error(f"Error storing {encoding} variant of {path}: {str(e)}")
+                bodies.pop(encoding, None)
+        return StoredPortfolio(files, bodies, digest, 0)
+
+    def _remove_stale_variants(self, path: Path, digest: str) -> None:
+        for extension, _ in COMPRESSORS.values():
+            for variant_path in path.parent.glob(f"{path.stem}.*.{extension}"):
+                if variant_path != self._variant_path(path, digest, extension):
+                    variant_path.unlink(missing_ok=True)
+
+    def _load(self, slug: str) -> Optional[StoredPortfolio]:
+        for path in (self._path(slug), self._legacy_path(slug)):
+            try:
+                with open(path, 'rb') as f:
+                    stat = os.fstat(f.fileno())
+                    body = f.read() if stat.st_size <= self.stream_threshold else None
+            except FileNotFoundError:
+                continue
+            digest = content_digest(body) if body is not None else file_digest(path)
+            entry = self._variants(path, digest, body)
+            entry.mtime_ns = stat.st_mtime_ns
+            return entry
+        return None
+
     def save_portfolio(self, slug: str, portfolio_data: dict) -> None:
         """Save portfolio data to a file"""
-        file_path = self.storage_dir / f"{slug}.html"
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(portfolio_data["html_content"])
-            
-    def get_portfolio(self, slug: str) -> str:
-        """Get portfolio HTML content by slug"""
-        file_path = self.storage_dir / f"{slug}.html"
-        if not file_path.exists():
+        if not SLUG_PATTERN.match(slug):
+            raise ValueError(f"Invalid portfolio slug: {slug}")
+        body = portfolio_data["html_content"].encode("utf-8")
+        path = self._path(slug)
+        path.parent.mkdir(exist_ok=True)
+
+        # Variants first, so they exist by the time the new page is visible
+        digest = content_digest(body)
+        entry = self._variants(path, digest, body)
+        self._write_atomic(path, body)
+        self._remove_stale_variants(path, digest)
+
+        # A redeploy replaces the page in the cache as well as on disk
+        entry.mtime_ns = os.stat(path).st_mtime_ns
+        self._cache_put(slug, entry)
+
+    def get_cached(self, slug: str) -> Optional[StoredPortfolio]:
+        """Get a portfolio only if it is in the hot cache"""
+        if not SLUG_PATTERN.match(slug):
+            return None
+        return self._cache_get(slug)
+
+    def get_stored(self, slug: str) -> Optional[StoredPortfolio]:
+        """Get a portfolio with its compressed variants, loading it on a cache miss"""
+        if not SLUG_PATTERN.match(slug):
             return None
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read() 
\ No newline at end of file
+        entry = self._cache_get(slug)
+        if entry is None:
+            entry = self._load(slug)
+            if entry is None:
+                return None
+            self._cache_put(slug, entry)
+        return entry
+
+    def iter_pages(self) -> Iterator[bytes]:
+        """Yield the body of every deployed page, sharded or legacy."""
+        for path in chain(self.storage_dir.glob('*/*.html'), self.storage_dir.glob('*.html')):
+            try:
+                yield path.read_bytes()
+            except FileNotFoundError:
+                continue
+
+    def get_portfolio_bytes(self, slug: str) -> Optional[bytes]:
+        """Get the UTF-8 encoded portfolio page by slug"""
+        entry = self.get_stored(slug)
+        return entry.body if entry is not None else None
+
+    def get_portfolio(self, slug: str) -> Optional[str]:
+        """Get portfolio HTML content by slug"""
+        body = self.get_portfolio_bytes(slug)
+        return body.decode("utf-8") if body is not None else None
@@ -1,10 +1,19 @@
+import re
+from html import escape, unescape
+from typing import Dict, List
+
+from templates.compiled_template import CompiledTemplate
+from templates.section_cache import Section, SectionCache, is_large_input
+
+# The page shell: static head and CSS, then one slot per section. The
+# <title> comes after the stylesheet so everything up to it, CSS included,
+# compiles into one static chunk.
 PORTFOLIO_TEMPLATE = '''
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{name} - Portfolio</title>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
     <style>
         :root {{
@@ -312,9 +321,30 @@ PORTFOLIO_TEMPLATE = '''
             font-size: 1rem;
         }}
     </style>
+    {title_html}
 </head>
 <body>
-    <header>
+    {header_html}
+
+    {about_html}
+
+    {skills_html}
+
+    {projects_html}
+
+    {contact_html}
+
+    {footer_html}
+</body>
+</html>
+'''
+
+# Each section's root element carries data-section="<id>", so a client
+# can swap in a re-rendered fragment without reloading the page.
+SECTION_TEMPLATES = {
+    'title': '''<title data-section="title">{name} - Portfolio</title>''',
+
+    'header': '''<header data-section="header">
         <nav class="container">
             <a href="#" class="logo">{name}</a>
             <div class="nav-links">
@@ -324,40 +354,40 @@ PORTFOLIO_TEMPLATE = '''
                 <a href="#contact">Contact</a>
             </div>
         </nav>
-    </header>
+    </header>''',
 
-    <div class="about-section">
+    'about': '''<div class="about-section" data-section="about">
         <div class="container">
             <div class="about-content">
                 <div class="about-image" style="width: 400px; height: 400px; border-radius: 50%; overflow: hidden;">
-                    {profile_image}
+                    {profile_image_html}
                 </div>
                 <div class="about-text">
                     <p>{about_me}</p>
                 </div>
             </div>
         </div>
-    </div>
+    </div>''',
 
-    <section id="skills" class="skills">
+    'skills': '''<section id="skills" class="skills" data-section="skills">
         <div class="container">
             <h2 class="section-title">Skills</h2>
             <div class="skills-grid">
                 {skills_html}
             </div>
         </div>
-    </section>
+    </section>''',
 
-    <section id="projects" class="projects">
+    'projects': '''<section id="projects" class="projects" data-section="projects">
         <div class="container">
             <h2 class="section-title">Projects</h2>
             <div class="projects-grid">
                 {projects_html}
             </div>
         </div>
-    </section>
+    </section>''',
 
-    <section id="contact" class="contact">
+    'contact': '''<section id="contact" class="contact" data-section="contact">
         <div class="container">
             <h2 class="section-title">Get in Touch</h2>
             <p>I'm always open to new opportunities and collaborations.</p>
@@ -367,80 +397,237 @@ PORTFOLIO_TEMPLATE = '''
                 <a href="{linkedin}"><i class="fab fa-linkedin"></i></a>
             </div>
         </div>
-    </section>
+    </section>''',
 
-    <footer>
+    'footer': '''<footer data-section="footer">
         <div class="container">
             <p>&copy; {name} 2024. All rights reserved.</p>
         </div>
-    </footer>
-</body>
-</html>
-'''
+    </footer>''',
+}
 
-def generate_portfolio(user_info):
-    # Add debugging log
-    print("Profile image in user_info:", bool(user_info.get('profile_image')))
-    
-    # Convert skills string to HTML
-    skills_list = [skill.strip() for skill in user_info['skills'].split(',')]
-    skills_html = '\n'.join([
-        f'''
+SKILL_CARD_TEMPLATE = CompiledTemplate('''
         <div class="skill-card">
             <div class="skill-info">
                 <h3>{skill}</h3>
             </div>
         </div>
-        ''' for skill in skills_list
-    ])
+        ''')
 
-    # Generate projects HTML
-    projects = user_info.get('projects', [])
-    if not projects:
-        projects_html = '''
+EMPTY_PROJECTS_HTML = '''
         <div class="empty-projects">
             <p>No projects added yet.</p>
         </div>
         '''
-    else:
-        projects_html = '\n'.join([
-            f'''
-            <div class="project-card">
+
+PROJECT_CARD_TEMPLATE = CompiledTemplate('''
+            <div class="project-card" data-section="{section_id}">
                 <div class="project-image-container">
-                    <img src="{project['image']}" alt="{project['title']}" class="project-image">
+                    <img src="{image}" alt="{title}" class="project-image" loading="lazy" decoding="async">
                 </div>
                 <div class="project-info">
-                    <h3>{project['title']}</h3>
-                    <p class="project-description">{project['description']}</p>
-                    {f'<p class="project-technologies">Technologies: {project["technologies"]}</p>' if project.get("technologies") else ''}
+                    <h3>{title}</h3>
+                    <p class="project-description">{description}</p>
+                    {technologies_html}
                     <div class="project-links">
-                        {f'<a href="{project["github"]}" class="project-link" target="_blank"><i class="fab fa-github"></i> GitHub</a>' if project.get('github') else ''}
-                        {f'<a href="{project["live"]}" class="project-link" target="_blank"><i class="fas fa-external-link-alt"></i> Live</a>' if project.get('live') else ''}
+                        {github_html}
+                        {live_html}
                     </div>
                 </div>
             </div>
-            ''' for project in projects
-        ])
-
-    # Format the about me section
-    about_me_text = f"Hello my name is {user_info['name']}! I am {user_info.get('about_me', '')}"
-
-    # Create the profile image HTML
-    profile_image_html = ''
-    if user_info.get('profile_image'):
-        print("Creating profile image HTML")
-        profile_image_html = f'<img src="{user_info["profile_image"]}" alt="Profile" style="width: 100%; height: 100%; object-fit: cover;">'
-    else:
-        print("No profile image found in user_info")
-    
-    # Return the formatted template
-    return PORTFOLIO_TEMPLATE.format(
-        name=user_info['name'],
-        about_me=about_me_text,  # Use the formatted about me text
-        skills_html=skills_html,
-        projects_html=projects_html,
-        email=user_info['email'],
-        github=user_info['github'],
-        linkedin=user_info.get('linkedin', '#'),
-        profile_image=profile_image_html
-    )
\ No newline at end of file
+            ''')
+
+TECHNOLOGIES_TEMPLATE = CompiledTemplate('<p class="project-technologies">Technologies: {technologies}</p>')
+GITHUB_LINK_TEMPLATE = CompiledTemplate('<a href="{url}" class="project-link" target="_blank"><i class="fab fa-github"></i> GitHub</a>')
+LIVE_LINK_TEMPLATE = CompiledTemplate('<a href="{url}" class="project-link" target="_blank"><i class="fas fa-external-link-alt"></i> Live</a>')
+PROFILE_IMAGE_TEMPLATE = CompiledTemplate('<img src="{src}" alt="Profile" class="profile-image" style="width: 100%; height: 100%; object-fit: cover;">')
+
+# Wraps an image whose resized variants exist: browsers that support WebP
+# pick a width from srcset, and the rest fall back to the JPEG
+PICTURE_TEMPLATE = CompiledTemplate(
+    '<picture><source type="image/webp" srcset="{srcset}" sizes="{sizes}">'
+    '<img src="{fallback}" width="{width}" height="{height}"{attributes_html}></picture>'
+)
+
+# Rendered width of each kind of image, for the srcset "sizes" hint
+IMAGE_SIZES = {
+    'project-image': '(max-width: 768px) calc(100vw - 4rem), 380px',
+    'profile-image': '(max-width: 768px) 300px, 400px',
+}
+DEFAULT_IMAGE_SIZES = '100vw'
+
+IMG_TAG_PATTERN = re.compile(r'<img\b([^>]*?)/?>', re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'([^\s=/]+)(\s*=\s*"([^"]*)")?')
+# Set by PICTURE_TEMPLATE or replaced by the variants
+REPLACED_ATTRIBUTES = {'src', 'srcset', 'sizes', 'width', 'height'}
+
+COMPILED_PORTFOLIO_TEMPLATE = CompiledTemplate(PORTFOLIO_TEMPLATE)
+COMPILED_SECTION_TEMPLATES = {name: CompiledTemplate(source) for name, source in SECTION_TEMPLATES.items()}
+
+PROJECT_FIELDS = ('image', 'title', 'description', 'technologies', 'github', 'live')
+
+section_cache = SectionCache()
+
+
+def render_skills(skills):
+    skills_list = [skill.strip() for skill in skills.split(',')]
+    return '\n'.join(SKILL_CARD_TEMPLATE.render(skill=skill) for skill in skills_list)
+
+def render_project(project, section_id=''):
+    return PROJECT_CARD_TEMPLATE.render(
+        section_id=section_id,
+        image=project.get('image'),
+        title=project['title'],
+        description=project['description'],
+        technologies_html=TECHNOLOGIES_TEMPLATE.render(technologies=project['technologies']) if project.get('technologies') else '',
+        github_html=GITHUB_LINK_TEMPLATE.render(url=project['github']) if project.get('github') else '',
+        live_html=LIVE_LINK_TEMPLATE.render(url=project['live']) if project.get('live') else ''
+    )
+
+def _section(section_id, render, *inputs):
+    if any(map(is_large_input, inputs)):
+        return section_cache.render_uncached(section_id, lambda: (render(), None))
+    return section_cache.get_or_render((section_id, *inputs), lambda: (render(), None))
+
+def _render_section(template, **values):
+    return lambda: COMPILED_SECTION_TEMPLATES[template].render(**values)
+
+def _card(key):
+    fields = dict(zip(PROJECT_FIELDS, key[1:]))
+    render = lambda: (render_project(fields, key[0]), None)
+    if is_large_input(fields['image']):
+        return section_cache.render_uncached(key[0], render)
+    return section_cache.get_or_render(key, render)
+
+def _projects_section(projects):
+    # Keyed on every card's inputs, so an unchanged project list is one lookup
+    projects = projects or []
+    card_keys = [(f"projects-{index}", *map(project.get, PROJECT_FIELDS)) for index, project in enumerate(projects)]
+
+    def render():
+        cards = [_card(key) for key in card_keys]
+        projects_html = '\n'.join(card.html for card in cards) if cards else EMPTY_PROJECTS_HTML
+        return COMPILED_SECTION_TEMPLATES['projects'].render(projects_html=projects_html), cards
+
+    if any(is_large_input(project.get('image')) for project in projects):
+        return section_cache.render_uncached('projects', render)
+    return section_cache.get_or_render(('projects', *card_keys), render)
+
+def _section_renders(user_info):
+    """(section ID, render, inputs) for every section but the projects."""
+    name = user_info['name']
+    about_me = f"Hello my name is {name}! I am {user_info.get('about_me') or ''}"
+    profile_image = user_info.get('profile_image')
+    skills = user_info['skills']
+    contact = {
+        'email': user_info['email'],
+        'github': user_info['github'],
+        'linkedin': user_info.get('linkedin') or '#',
+    }
+
+    return [
+        ('title', _render_section('title', name=name), (name,)),
+        ('header', _render_section('header', name=name), (name,)),
+        ('about', lambda: COMPILED_SECTION_TEMPLATES['about'].render(
+            about_me=about_me,
+            profile_image_html=PROFILE_IMAGE_TEMPLATE.render(src=profile_image) if profile_image else ''
+        ), (about_me, profile_image)),
+        ('skills', lambda: COMPILED_SECTION_TEMPLATES['skills'].render(
+            skills_html=render_skills(skills)
+        ), (skills,)),
+        ('contact', _render_section('contact', **contact), tuple(contact.values())),
+        ('footer', _render_section('footer', name=name), (name,)),
+    ]
+
+def render_sections(user_info) -> List[Section]:
+    """Render every section of the page, reusing cached fragments for unchanged inputs."""
+    sections = [_section(section_id, render, *inputs) for section_id, render, inputs in _section_renders(user_info)]
+    sections.insert(4, _projects_section(user_info.get('projects')))
+    return sections
+
+def section_digests(sections: List[Section]) -> Dict[str, str]:
+    """Digest of every section and nested section, by section ID."""
+    digests = {}
+    for section in sections:
+        digests[section.id] = section.digest
+        digests.update(section_digests(section.children))
+    return digests
+
+def changed_sections(sections: List[Section], known: Dict[str, str]) -> List[Dict[str, str]]:
+    """Fragments the client must replace, given the section digests it already has.
+
+    A changed section with nested sections is patched child by child when
+    the client holds exactly the same children. Otherwise, e.g. when a
+    project was added or removed, the whole section is sent.
+    """
+    fragments = []
+    for section in sections:
+        if section.digest and known.get(section.id) == section.digest:
+            continue
+        child_ids = {child.id for child in section.children}
+        known_child_ids = {key for key in known if key.startswith(f"{section.id}-")}
+        if section.children and child_ids == known_child_ids:
+            fragments.extend(changed_sections(section.children, known))
+        else:
+            fragments.append({'id': section.id, 'html': section.html})
+    return fragments
+
+def assemble_portfolio(sections: List[Section]) -> str:
+    return COMPILED_PORTFOLIO_TEMPLATE.render(**{f"{section.id}_html": section.html for section in sections})
+
+def generate_portfolio(user_info):
+    """Render the whole page once, bypassing the section cache.
+
+    For one-off renders such as a deploy, where nothing is reused and
+    digesting every section would only add work. The editor preview goes
+    through ``render_sections``.
+    """
+    values = {f"{section_id}_html": render() for section_id, render, _ in _section_renders(user_info)}
+    projects = user_info.get('projects')
+    projects_html = '\n'.join(
+        render_project({field: project.get(field) for field in PROJECT_FIELDS}, f"projects-{index}")
+        for index, project in enumerate(projects)
+    ) if projects else EMPTY_PROJECTS_HTML
+    values['projects_html'] = COMPILED_SECTION_TEMPLATES['projects'].render(projects_html=projects_html)
+    return COMPILED_PORTFOLIO_TEMPLATE.render(**values)
+
+def _attributes(source: str) -> Dict[str, str]:
+    # Attributes without a value (e.g. "hidden") map to None
+    return {
+        name.lower(): unescape(value) if assignment else None
+        for name, assignment, value in ATTRIBUTE_PATTERN.findall(source)
+    }
+
+def _picture(attributes: Dict[str, str], manifest: Dict) -> str:
+    kept = ''.join(
+        f' {name}="{escape(value)}"' if value is not None else f' {name}'
+        for name, value in attributes.items() if name not in REPLACED_ATTRIBUTES
+    )
+    css_class = (attributes.get('class') or '').split()
+    sizes = next((IMAGE_SIZES[c] for c in css_class if c in IMAGE_SIZES), DEFAULT_IMAGE_SIZES)
+    return PICTURE_TEMPLATE.render(
+        srcset=', '.join(f"{url} {width}w" for width, url in manifest['webp']),
+        sizes=sizes,
+        fallback=manifest['fallback'],
+        width=manifest['width'],
+        height=manifest['height'],
+        attributes_html=kept
+    )
+
+def with_responsive_images(html: str, manifests: Dict[str, Dict]) -> str:
+    """Turn each <img> whose src has resized variants into a <picture>.
+
+    ``manifests`` maps an image URL to its variants, as recorded by
+    ``AssetStore.save_derivatives``. Other images are left untouched.
+    """
+    def replace(match):
+        attributes = _attributes(match.group(1))
+        manifest = manifests.get(attributes.get('src') or '')
+        return _picture(attributes, manifest) if manifest else match.group(0)
+
+    return IMG_TAG_PATTERN.sub(replace, html)
+
+def image_sources(html: str) -> List[str]:
+    """The src of every <img> in a page."""
+    sources = (_attributes(match.group(1)).get('src') for match in IMG_TAG_PATTERN.finditer(html))
+    return [src for src in sources if src]
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Sections with an input this long (an inline data-URI image) are not
+# cached: looking one up means hashing the whole input, which costs more
+# than rendering the section again.
+LARGE_INPUT_CHARS = 16 * 1024
+
+# Digest of an uncached section. It matches nothing a client holds, so the
+# section is always sent.
+UNCACHED_DIGEST = ''
+
+
+def fragment_digest(html: str) -> str:
+    return hashlib.sha256(html.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+
+
+def is_large_input(value) -> bool:
+    return value.__class__ is str and len(value) >= LARGE_INPUT_CHARS
+
+
+def _hashable(key: Tuple) -> Tuple:
+    return tuple(
+        _hashable(value) if value.__class__ is tuple else value if value is None else str(value)
+        for value in key
+    )
+
+
+class Section:
+    """A rendered part of the page and the digest clients use to tell if it changed."""
+
+    def __init__(self, id: str, digest: str, html: str, children: List['Section'] = None):
+        self.id = id
+        self.digest = digest
+        self.html = html
+        self.children = children or []
+
+
+class SectionCache:
+    """LRU of rendered page sections, keyed by the inputs they came from.
+
+    The key is a tuple of the section ID and its inputs, so a hit is one
+    dict lookup and hashes nothing beyond Python's own string hash. The
+    digest clients send back in patch mode is computed when a section is
+    rendered and is stored with it.
+
+    Sections are bounded by total size, keys included.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or int(os.getenv('PORTFOLIO_SECTION_CACHE_MB', '32')) * 1024 * 1024
+        self._sections: "OrderedDict[Tuple, Section]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def get_or_render(self, key: Tuple, render: Callable[[], Tuple[str, List[Section]]]) -> Section:
+        """Return the section for ``key``; ``render`` returns its markup and nested sections."""
+        try:
+            with self._lock:
+                section = self._sections.get(key)
+                if section is not None:
+                    self._sections.move_to_end(key)
+                    self.hits += 1
+                    return section
+                self.misses += 1
+        except TypeError:
+            # Unhashable input, e.g. a list where a string was expected
+            return self.get_or_render(_hashable(key), render)
+
+        html, children = render()
+        section = Section(key[0], fragment_digest(html), html, children)
+        # Inputs mostly reappear in the markup, so the key costs about as much again
+        size = 2 * len(html)
+        with self._lock:
+            if key not in self._sections:
+                self._sections[key] = section
+                self._size += size
+                while self._size > self.max_bytes:
+                    _, evicted = self._sections.popitem(last=False)
+                    self._size -= 2 * len(evicted.html)
+        return section
+
+    def render_uncached(self, section_id: str, render: Callable[[], Tuple[str, List[Section]]]) -> Section:
+        """Render a section with a large input without looking it up or keeping it."""
+        html, children = render()
+        with self._lock:
+            self.uncached += 1
+        return Section(section_id, UNCACHED_DIGEST, html, children)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sections.clear()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._sections),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'uncached': self.uncached,
+            }
@@ -0,0 +1,149 @@
+import base64
+import os
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from services.asset_store import AssetStore
+from storage import PortfolioStorage
+
+OLD = time.time() - 7 * 24 * 3600
+
+
+def image_bytes(color='red', fmt='PNG', size=(4, 4)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssetStore(root=str(tmp_path / 'assets'), public_base_url='', max_bytes=64 * 1024)
+
+
+def age(store, name):
+    os.utime(store.path_for(name), (OLD, OLD))
+
+
+def test_same_bytes_are_stored_once(store):
+    data = image_bytes()
+
+    name = store.put(data)
+
+    assert store.put(data) == name
+    assert name.endswith('.png') and len(list(store.root.glob('*/*.png'))) == 1
+    assert store.put(image_bytes('blue')) != name
+
+
+def test_name_follows_the_real_format(store):
+    assert store.put(image_bytes(fmt='JPEG')).endswith('.jpg')
+    assert store.put(image_bytes(fmt='GIF')).endswith('.gif')
+
+
+@pytest.mark.parametrize('data', [
+    b'not an image',
+    b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>',
+    b'',
+])
+def test_rejects_unsupported_files(store, data):
+    assert store.put(data) is None
+    assert list(store.root.glob('*/*')) == []
+
+
+def test_rejects_oversized_images(store):
+    data = image_bytes(size=(64, 64))
+    small = AssetStore(root=str(store.root), max_bytes=len(data) - 1)
+
+    assert small.put(data) is None
+    assert store.put(data) is not None
+
+
+def test_serves_the_stored_bytes(store):
+    data = image_bytes()
+    name = store.put(data)
+
+    assert store.read(name) == data
+    assert store.path_for(name).read_bytes() == data
+    assert store.read('0' * 64 + '.png') is None
+    assert store.path_for('../secret.png') is None
+
+
+def test_externalize_html_stores_each_data_uri_once(store):
+    uri = 'data:image/png;base64,' + base64.b64encode(image_bytes()).decode()
+    html = f'<img src="{uri}"><img src="{uri}"><img src="data:image/png;base64,bm90IGFuIGltYWdl">'
+
+    externalized = store.externalize_html(html)
+
+    name = store.asset_name(externalized.split('"')[1])
+    assert externalized.count(f'/assets/{name}') == 2
+    # An undecodable image stays inline
+    assert 'data:image/png;base64,bm90IGFuIGltYWdl' in externalized
+
+
+def deploy(tmp_path, *pages):
+    portfolios = PortfolioStorage(storage_dir=str(tmp_path / 'portfolios'))
+    for index, html in enumerate(pages):
+        portfolios.save_portfolio(f'page-{index}', {'html_content': html})
+    return portfolios
+
+
+def test_collect_garbage_removes_unreferenced_assets(store, tmp_path):
+    used, unused = store.put(image_bytes('red')), store.put(image_bytes('blue'))
+    age(store, used)
+    age(store, unused)
+    portfolios = deploy(tmp_path, f'<img src="https://cdn.example.com/assets/{used}">')
+
+    assert store.collect_garbage(portfolios.iter_pages()) == 1
+    assert store.read(used) is not None
+    assert store.read(unused) is None
+
+
+def test_collect_garbage_keeps_recent_assets(store, tmp_path):
+    # Stored by a deploy that has not saved its page yet
+    name = store.put(image_bytes())
+
+    assert store.collect_garbage(deploy(tmp_path).iter_pages()) == 0
+    assert store.read(name) is not None
+
+
+def test_reusing_an_asset_restarts_its_grace_period(store, tmp_path):
+    data = image_bytes()
+    name = store.put(data)
+    age(store, name)
+
+    store.put(data)
+
+    assert store.collect_garbage(deploy(tmp_path).iter_pages()) == 0
+
+
+def test_collect_garbage_follows_variant_manifests(store, tmp_path):
+    original = store.put(image_bytes('red', size=(32, 32)))
+    store.save_derivatives(original, {
+        'width': 32, 'height': 32,
+        'webp': {16: image_bytes('red', 'WEBP', (16, 16))},
+        'jpeg': image_bytes('red', 'JPEG', (32, 32)),
+    })
+    names = [path.name for path in store.root.glob('*/*') if not path.name.endswith('.json')]
+    for name in names:
+        age(store, name)
+
+    # The page only names the original; its variants stay with it
+    portfolios = deploy(tmp_path, f'<img src="/assets/{original}">')
+    assert store.collect_garbage(portfolios.iter_pages()) == 0
+    assert store.get_derivatives(original) is not None
+
+    # Once no page uses the original, it goes with its variants and manifest
+    assert store.collect_garbage([]) == len(names)
+    assert store.get_derivatives(original) is None
+    assert list(store.root.glob('*/*')) == []
+
+
+def test_collect_garbage_reads_legacy_pages(store, tmp_path):
+    name = store.put(image_bytes())
+    age(store, name)
+    portfolios = deploy(tmp_path)
+    (portfolios.storage_dir / 'old-page.html').write_text(f'<img src="/assets/{name}">')
+
+    assert store.collect_garbage(portfolios.iter_pages()) == 0
@@ -0,0 +1,44 @@
+import html
+
+import pytest
+
+from templates import portfolio_template
+from templates.compiled_template import CompiledTemplate
+
+TEMPLATES = {
+    name: value for name, value in vars(portfolio_template).items() if isinstance(value, CompiledTemplate)
+}
+TEMPLATES.update({f'section:{name}': template for name, template in portfolio_template.COMPILED_SECTION_TEMPLATES.items()})
+
+VALUES = ['plain', '', 'Tom & Jerry <script>"x"</script> it\'s', 'data:image/png;base64,AAAA', 'ünïcødé ✓']
+
+
+@pytest.mark.parametrize('name', sorted(TEMPLATES))
+@pytest.mark.parametrize('value', VALUES)
+def test_render_matches_str_format_with_escaped_values(name, value):
+    template = TEMPLATES[name]
+    values = {slot: value for slot in template.slots}
+    expected = template.source.format(**{
+        slot: value if slot.endswith('_html') else html.escape(value) for slot in template.slots
+    })
+
+    assert template.render(**values) == expected
+
+
+def test_none_and_non_string_values():
+    template = CompiledTemplate('<p>{count}</p>{extra_html}{missing}')
+
+    assert template.render(count=3, extra_html=None, missing=None) == '<p>3</p>'
+
+
+def test_repeated_slots_and_braces():
+    template = CompiledTemplate('{{ {name} }} {name}')
+
+    assert template.slots == ('name',)
+    assert template.render(name='<a>') == '{ &lt;a&gt; } &lt;a&gt;'
+
+
+@pytest.mark.parametrize('source', ['{name!r}', '{name:>10}', '{0}', '{user.name}'])
+def test_unsupported_fields_are_rejected(source):
+    with pytest.raises(ValueError):
+        CompiledTemplate(source)
@@ -0,0 +1,44 @@
+import pytest
+
+from services.file_streaming import RangeNotSatisfiable, parse_range
+
+SIZE = 10899
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 99)),
+    ('bytes=100-', (100, SIZE - 1)),
+    ('bytes=10000-20000', (10000, SIZE - 1)),
+    ('bytes=-500', (SIZE - 500, SIZE - 1)),
+    ('bytes=-20000', (0, SIZE - 1)),
+    ('bytes=5-5', (5, 5)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize('header', [
+    None,
+    '',
+    'items=0-10',
+    'bytes=500-100',
+    'bytes=0-10, 20-30',
+    'bytes=abc-',
+    'bytes=-',
+    'bytes=5',
+])
+def test_whole_file_ranges(header):
+    assert parse_range(header, SIZE) is None
+
+
+@pytest.mark.parametrize('header, size', [
+    (f'bytes={SIZE}-', SIZE),
+    (f'bytes={SIZE + 100}-', SIZE),
+    (f'bytes={SIZE}-{SIZE + 10}', SIZE),
+    ('bytes=-0', SIZE),
+    ('bytes=0-', 0),
+    ('bytes=-10', 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
@@ -0,0 +1,140 @@
+import os
+import time
+
+import pytest
+
+from services import github_parser
+from services.github_client import GitHubClient
+from services.http_cache import ETagStore
+
+PAGE_2 = 'https://api.github.com/user/1/repos?per_page=100&page=2'
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Answers by URL; 304 when If-None-Match carries the URL's current ETag."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        status, data, page_headers = self.pages[url]
+        if status == 200 and headers and headers.get('If-None-Match') == page_headers.get('ETag'):
+            return FakeResponse(304, None, {'ETag': page_headers['ETag']})
+        return FakeResponse(status, data, page_headers)
+
+
+def make_client(tmp_path, pages, ttl_seconds=3600):
+    store = ETagStore(max_entries=16, disk_dir=str(tmp_path), ttl_seconds=ttl_seconds, max_disk_bytes=1024 * 1024)
+    client = GitHubClient(token='test-token', cache=store)
+    client.session = FakeSession(pages)
+    return client
+
+
+def test_revalidates_with_the_stored_etag(tmp_path):
+    url = 'https://api.github.com/users/octo'
+    client = make_client(tmp_path, {url: (200, {'login': 'octo'}, {'ETag': '"v1"'})})
+
+    first = client.get('users/octo')
+    second = client.get('users/octo')
+
+    assert not first.from_cache and first.data == {'login': 'octo'}
+    assert second.from_cache and second.data == {'login': 'octo'}
+    assert [headers.get('If-None-Match') for _, headers in client.session.requests] == [None, '"v1"']
+
+
+def test_changed_etag_replaces_the_stored_response(tmp_path):
+    url = 'https://api.github.com/users/octo'
+    client = make_client(tmp_path, {url: (200, {'login': 'octo'}, {'ETag': '"v1"'})})
+    client.get('users/octo')
+
+    client.session.pages[url] = (200, {'login': 'octo', 'name': 'Octo'}, {'ETag': '"v2"'})
+    changed = client.get('users/octo')
+    again = client.get('users/octo')
+
+    assert not changed.from_cache and changed.data['name'] == 'Octo'
+    assert again.from_cache and again.data['name'] == 'Octo'
+    assert client.session.requests[-1][1]['If-None-Match'] == '"v2"'
+
+
+def test_not_modified_restarts_the_ttl(tmp_path):
+    url = 'https://api.github.com/users/octo'
+    client = make_client(tmp_path, {url: (200, {'login': 'octo'}, {'ETag': '"v1"'})}, ttl_seconds=60)
+    client.get('users/octo')
+    key = client._cache_key(url, None)
+    path = client.cache._disk_path(key)
+
+    # Stored almost a full TTL ago, in memory and on disk
+    stale = time.time() - 55
+    client.cache._memory[key] = (stale, client.cache._memory[key][1])
+    os.utime(path, (stale, stale))
+
+    assert client.get('users/octo').from_cache
+    assert time.time() - path.stat().st_mtime < 5
+    assert time.time() - client.cache._memory[key][0] < 5
+
+    # A fresh client reading the disk tier still finds the revalidated entry
+    reloaded = ETagStore(max_entries=16, disk_dir=str(tmp_path), ttl_seconds=60, max_disk_bytes=1024 * 1024)
+    assert reloaded.get(key)['headers']['ETag'] == '"v1"'
+
+
+def test_entries_are_per_identity(tmp_path):
+    url = 'https://api.github.com/users/octo'
+    client = make_client(tmp_path, {url: (200, {'login': 'octo'}, {'ETag': '"v1"'})})
+    client.get('users/octo')
+
+    other = GitHubClient(token='other-token', cache=client.cache)
+    other.session = FakeSession(client.session.pages)
+    assert not other.get('users/octo').from_cache
+    assert 'If-None-Match' not in other.session.requests[0][1]
+
+
+@pytest.fixture
+def rest_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(github_parser.get_graphql_client(), 'available', lambda: False)
+
+    def use(pages):
+        client = make_client(tmp_path, pages)
+        monkeypatch.setattr(github_parser, 'get_github_client', lambda: client)
+        return client
+    return use
+
+
+def test_follows_link_pagination_and_revalidates_every_page(rest_client):
+    client = rest_client({
+        'https://api.github.com/users/octo/repos': (200, [{'name': 'one'}], {
+            'ETag': '"p1"',
+            'Link': f'<{PAGE_2}>; rel="next", <{PAGE_2}>; rel="last"',
+        }),
+        PAGE_2: (200, [{'name': 'two'}], {
+            'ETag': '"p2"',
+            'Link': '<https://api.github.com/user/1/repos?per_page=100&page=1>; rel="prev"',
+        }),
+    })
+
+    assert [r['name'] for r in github_parser.get_public_repos('octo')] == ['one', 'two']
+    # Cached pages keep their Link header, so the second listing pages the same way
+    assert [r['name'] for r in github_parser.get_public_repos('octo')] == ['one', 'two']
+
+    requested = [(url, headers.get('If-None-Match')) for url, headers in client.session.requests]
+    assert requested == [
+        ('https://api.github.com/users/octo/repos', None),
+        (PAGE_2, None),
+        ('https://api.github.com/users/octo/repos', '"p1"'),
+        (PAGE_2, '"p2"'),
+    ]
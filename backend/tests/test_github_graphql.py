@@ -0,0 +1,112 @@
+from pathlib import Path
+
+import pytest
+
+from services.github_client import GitHubFetchError
+from services.github_graphql import GitHubGraphQLClient, RecordedTransport, _to_repo
+
+RECORDING = Path(__file__).parent / 'recordings' / 'github_graphql.json'
+
+
+class CountingTransport(RecordedTransport):
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls = 0
+
+    def execute(self, query, variables):
+        self.calls += 1
+        return super().execute(query, variables)
+
+
+@pytest.fixture
+def transport():
+    return CountingTransport(RECORDING)
+
+
+def test_iter_repository_pages_follows_the_cursor(transport):
+    client = GitHubGraphQLClient(transport)
+    pages = list(client.iter_repository_pages('octo-dev'))
+
+    assert [[repo['name'] for repo in page] for page in pages] == [['weather-dashboard', 'pysched'], ['dotfiles']]
+    assert transport.calls == 2
+
+
+def test_to_repo_matches_the_rest_shape(transport):
+    pages = list(GitHubGraphQLClient(transport).iter_repository_pages('octo-dev'))
+    weather, pysched = pages[0]
+
+    assert weather == {
+        'name': 'weather-dashboard',
+        'description': 'Forecast charts in React',
+        'html_url': 'https://github.com/octo-dev/weather-dashboard',
+        'homepage': 'https://weather.example.com',
+        'stargazers_count': 12,
+        'forks_count': 3,
+        'topics': ['react', 'charts'],
+        'languages': {'JavaScript': 52311, 'CSS': 4210},
+        'readme': '# Weather Dashboard\n',
+    }
+    # README names other than README.md are found too
+    assert pysched['readme'] == 'pysched\n=======\n'
+    assert pages[1][0]['readme'] is None
+    assert _to_repo({'name': 'bare', 'url': 'https://github.com/octo-dev/bare'})['languages'] == {}
+
+
+def test_get_repository_reuses_the_bulk_listing(transport):
+    client = GitHubGraphQLClient(transport)
+    list(client.iter_repository_pages('octo-dev'))
+
+    assert client.get_repository('octo-dev', 'pysched')['languages'] == {'Python': 18830}
+    assert client.get_repository('Octo-Dev', 'Weather-Dashboard')['stargazers_count'] == 12
+    assert transport.calls == 2
+
+
+def test_get_repository_queries_one_repository(transport):
+    client = GitHubGraphQLClient(transport)
+
+    assert client.get_repository('octo-org', 'toolkit')['readme'] == '# toolkit\n'
+    assert transport.calls == 1
+
+
+def test_organisation_listing_is_empty(transport):
+    assert GitHubGraphQLClient(transport).fetch_user_repositories('octo-org') == []
+
+
+class FailingTransport:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def execute(self, query, variables):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def page(name, has_next):
+    return {'data': {'user': {'repositories': {
+        'pageInfo': {'hasNextPage': has_next, 'endCursor': 'next'},
+        'nodes': [{'name': name, 'url': f'https://github.com/octo/{name}'}],
+    }}}}
+
+
+@pytest.mark.parametrize('failure', [
+    ConnectionError('reset'),
+    {'errors': [{'type': 'RATE_LIMITED', 'message': 'slow down'}]},
+    {'data': None},
+    {'data': {'user': {'repositories': {'nodes': []}}}},
+])
+def test_failed_page_raises_instead_of_truncating(failure):
+    pages = GitHubGraphQLClient(FailingTransport([page('one', True), failure])).iter_repository_pages('octo')
+
+    assert [repo['name'] for repo in next(pages)] == ['one']
+    with pytest.raises(GitHubFetchError):
+        next(pages)
+
+
+def test_failed_listing_is_not_indexed():
+    client = GitHubGraphQLClient(FailingTransport([page('one', True), ConnectionError('reset')]))
+    with pytest.raises(GitHubFetchError):
+        client.fetch_user_repositories('octo')
+
+    assert client._indexed('octo') is None
@@ -0,0 +1,78 @@
+import pytest
+
+from services import github_parser
+from services.github_client import GitHubFetchError, GitHubResponse
+
+NEXT = '<https://api.github.com/user/1/repos?page=2>; rel="next", <https://api.github.com/user/1/repos?page=2>; rel="last"'
+
+
+class FakeClient:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requested = []
+
+    def get(self, path_or_url, params=None):
+        self.requested.append(path_or_url)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def rest_only(monkeypatch):
+    monkeypatch.setattr(github_parser.get_graphql_client(), 'available', lambda: False)
+
+    def use(client):
+        monkeypatch.setattr(github_parser, 'get_github_client', lambda: client)
+        return client
+    return use
+
+
+def repo(name):
+    return {'name': name, 'description': f'{name} tool', 'html_url': f'https://github.com/octo/{name}'}
+
+
+def test_follows_link_pagination(rest_only):
+    client = rest_only(FakeClient(
+        GitHubResponse(200, [repo('one')], {'Link': NEXT}),
+        GitHubResponse(200, [repo('two')], {}),
+    ))
+
+    assert [p['name'] for p in github_parser.get_projects_with_description('octo')] == ['one', 'two']
+    assert client.requested == ['users/octo/repos', 'https://api.github.com/user/1/repos?page=2']
+
+
+def test_failed_page_raises_instead_of_truncating(rest_only):
+    rest_only(FakeClient(
+        GitHubResponse(200, [repo('one')], {'Link': NEXT}),
+        GitHubResponse(502, None, {}),
+    ))
+
+    pages = github_parser.iter_project_pages('octo')
+    assert [p['name'] for p in next(pages)] == ['one']
+    with pytest.raises(GitHubFetchError):
+        next(pages)
+
+
+def test_unknown_user_has_no_projects(rest_only):
+    rest_only(FakeClient(GitHubResponse(404, {'message': 'Not Found'}, {})))
+
+    assert github_parser.get_projects_with_description('nobody') == []
+
+
+def test_failed_first_page_raises(rest_only):
+    rest_only(FakeClient(GitHubResponse(403, {'message': 'rate limited'}, {})))
+
+    with pytest.raises(GitHubFetchError):
+        github_parser.get_projects_with_description('octo')
+
+
+def test_falls_back_to_rest_when_graphql_fails(rest_only, monkeypatch):
+    graphql = github_parser.get_graphql_client()
+    monkeypatch.setattr(graphql, 'available', lambda: True)
+
+    def unavailable(login):
+        raise GitHubFetchError('GitHub GraphQL request failed')
+        yield
+    monkeypatch.setattr(graphql, 'iter_repository_pages', unavailable)
+    rest_only(FakeClient(GitHubResponse(200, [repo('one')], {})))
+
+    assert [p['name'] for p in github_parser.get_projects_with_description('octo')] == ['one']
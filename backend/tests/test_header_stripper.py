@@ -0,0 +1,69 @@
+import asyncio
+import random
+
+import pytest
+
+from services.project_description_generator import HeaderStripper, ProjectDescriptionGenerator
+
+SAMPLES = [
+    "Title: Weather App\n\nA React dashboard that charts forecasts.\nIt caches API calls.",
+    "Project Title: Chess Engine\nDescription: A bitboard engine in Rust.\n\n",
+    "  \n\nDescription: Plain text\nwith a second line  \n",
+    "  Title: indented headers are kept\nbody",
+    "No headers at all, just a description.",
+    "Title: a header with no newline",
+    "Titles are not headers\nDescription:\nTitle: x\n\n  Body after blank lines\n\n\n",
+    "\n\n\n",
+    "",
+]
+
+
+def stream(text, chunk_sizes):
+    stripper = HeaderStripper()
+    parts, position = [], 0
+    for size in chunk_sizes:
+        parts.append(stripper.feed(text[position:position + size]))
+        position += size
+    parts.append(stripper.finish())
+    return parts
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_streamed_cleanup_matches_batch_cleanup(text):
+    expected = ProjectDescriptionGenerator(None)._clean_description(text)
+    rng = random.Random(text)
+    for _ in range(200):
+        sizes = [rng.randint(1, 8) for _ in range(len(text) + 1)]
+        # Equal joins also mean the first delta starts without whitespace
+        assert ''.join(stream(text, sizes)) == expected
+
+
+class ChunkedGateway:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, name, messages, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_streamed_deltas_join_to_the_final_description(text):
+    rng = random.Random(text)
+    sizes = [rng.randint(1, 8) for _ in range(len(text) + 1)]
+    chunks, position = [], 0
+    for size in sizes:
+        chunks.append(text[position:position + size])
+        position += size
+
+    generator = ProjectDescriptionGenerator(ChunkedGateway(chunks))
+    events = asyncio.run(collect(generator.stream_description('Title', None)))
+
+    final = events[-1]
+    assert final['fallback'] is False
+    assert ''.join(event['delta'] for event in events[:-1]) == final['description']
+    assert final['description'] == generator._clean_description(text)
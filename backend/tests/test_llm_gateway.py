@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from services import llm_gateway
+from services.llm_gateway import LLMGateway
+
+MESSAGES = [{'role': 'user', 'content': 'Describe a weather dashboard'}]
+
+
+def usage(prompt, completion):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+
+def response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage(20, 10))
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.acquired = []
+        self.reconciled = []
+
+    def acquire_blocking(self, tokens):
+        self.acquired.append(tokens)
+
+    async def acquire(self, tokens):
+        self.acquired.append(tokens)
+
+    def reconcile(self, estimated, actual):
+        self.reconciled.append((estimated, actual))
+
+    async def areconcile(self, estimated, actual):
+        self.reconcile(estimated, actual)
+
+
+class SyncCompletions:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.release = threading.Event()
+
+    def create(self, **params):
+        self.calls += 1
+        self.release.wait(self.delay)
+        return response(f"answer {self.calls}")
+
+
+class AsyncCompletions:
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def create(self, stream=False, **params):
+        self.calls.append(params)
+        await self.release.wait()
+        if stream:
+            return self._stream(params)
+        return response(f"answer {len(self.calls)}")
+
+    async def _stream(self, params):
+        for text in ('A weather ', 'dashboard.'):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+        if params.get('stream_options', {}).get('include_usage'):
+            yield SimpleNamespace(choices=[], usage=usage(40, 5))
+
+
+def gateway(sync=None, async_=None, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=sync)) if sync else None
+    async_client = SimpleNamespace(chat=SimpleNamespace(completions=async_)) if async_ else None
+    return LLMGateway(client, async_client, rate_limiter=RecordingLimiter(), **kwargs)
+
+
+def test_identical_calls_hit_the_cache():
+    completions = SyncCompletions()
+    llm = gateway(sync=completions)
+
+    assert llm.complete('site', MESSAGES, model='m') == 'answer 1'
+    assert llm.complete('site', MESSAGES, model='m') == 'answer 1'
+    assert llm.complete('site', MESSAGES, model='m', temperature=0.2) == 'answer 2'
+    assert completions.calls == 2
+    assert llm.stats()['site']['cache_hits'] == 1
+    assert llm.rate_limiter.reconciled == [(llm.estimate_tokens(MESSAGES, None), 30)] * 2
+
+
+def test_cached_answers_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_gateway.time, 'monotonic', lambda: now[0])
+    completions = SyncCompletions()
+    llm = gateway(sync=completions, ttl_seconds=60)
+
+    llm.complete('site', MESSAGES, model='m')
+    now[0] += 59
+    assert llm.complete('site', MESSAGES, model='m') == 'answer 1'
+    now[0] += 1
+    assert llm.complete('site', MESSAGES, model='m') == 'answer 2'
+
+
+def test_concurrent_sync_calls_are_coalesced():
+    completions = SyncCompletions(delay=5)
+    llm = gateway(sync=completions)
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(llm.complete, 'site', MESSAGES, 'm') for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while llm.stats().get('site', {}).get('coalesced', 0) < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        completions.release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ['answer 1'] * 4
+    assert completions.calls == 1
+
+
+def test_concurrent_async_calls_are_coalesced():
+    async def main():
+        completions = AsyncCompletions()
+        llm = gateway(async_=completions)
+        callers = [asyncio.ensure_future(llm.acomplete('site', MESSAGES, 'm')) for _ in range(4)]
+        await asyncio.sleep(0)
+        completions.release.set()
+        return await asyncio.gather(*callers), completions.calls, llm.stats()['site']
+
+    results, calls, stats = asyncio.run(main())
+    assert results == ['answer 1'] * 4
+    assert len(calls) == 1
+    assert stats['coalesced'] == 3
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def main():
+        completions = AsyncCompletions()
+        llm = gateway(async_=completions)
+        leader = asyncio.ensure_future(llm.acomplete('site', MESSAGES, 'm'))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(llm.acomplete('site', MESSAGES, 'm'))
+        await asyncio.sleep(0)
+        leader.cancel()
+        completions.release.set()
+        return await follower, leader.cancelled(), await llm.acomplete('site', MESSAGES, 'm')
+
+    assert asyncio.run(main()) == ('answer 1', True, 'answer 1')
+
+
+def test_streams_reconcile_reported_usage():
+    async def main():
+        completions = AsyncCompletions()
+        completions.release.set()
+        llm = gateway(async_=completions)
+        text = ''.join([delta async for delta in llm.astream('site', MESSAGES, 'm', max_tokens=50)])
+        return llm, completions, text
+
+    llm, completions, text = asyncio.run(main())
+    assert text == 'A weather dashboard.'
+    assert completions.calls[0]['stream_options'] == {'include_usage': True}
+    assert llm.rate_limiter.reconciled == [(llm.estimate_tokens(MESSAGES, 50), 45)]
+    assert llm.stats()['site']['completion_tokens'] == 5
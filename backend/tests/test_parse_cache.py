@@ -0,0 +1,79 @@
+import os
+import time
+
+from services import parse_cache
+from services.parse_cache import ParseCache
+
+RESUME = b'%PDF-1.4 Jane Doe, Python developer'
+
+
+def make_cache(tmp_path, **kwargs):
+    options = dict(max_entries=8, disk_dir=str(tmp_path), ttl_seconds=3600, max_disk_bytes=1024 * 1024)
+    options.update(kwargs)
+    return ParseCache(**options)
+
+
+def test_key_changes_with_content_and_parser_version():
+    key = ParseCache.key(RESUME, 'parse-resume', '2+1')
+
+    assert ParseCache.key(RESUME, 'parse-resume', '2+1') == key
+    assert ParseCache.key(RESUME + b' ', 'parse-resume', '2+1') != key
+    assert ParseCache.key(RESUME, 'parse-resume', '3+1') != key
+    assert ParseCache.key(RESUME, 'other', '2+1') != key
+
+
+def test_miss_then_memory_hit(tmp_path):
+    cache = make_cache(tmp_path)
+    key = ParseCache.key(RESUME, 'parse-resume', '2+1')
+
+    assert cache.get(key) is None
+    cache.set(key, {'name': 'Jane Doe'})
+
+    assert cache.get(key) == {'name': 'Jane Doe'}
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['memory_hits'] == 1
+
+
+def test_changed_upload_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set(ParseCache.key(RESUME, 'parse-resume', '2+1'), {'name': 'Jane Doe'})
+
+    assert cache.get(ParseCache.key(RESUME + b' (edited)', 'parse-resume', '2+1')) is None
+
+
+def test_disk_hit_survives_a_restart(tmp_path):
+    key = ParseCache.key(RESUME, 'parse-resume', '2+1')
+    make_cache(tmp_path).set(key, {'name': 'Jane Doe'})
+
+    restarted = make_cache(tmp_path)
+    assert restarted.get(key) == {'name': 'Jane Doe'}
+    assert restarted.stats()['disk_hits'] == 1
+    assert restarted.get(key) == {'name': 'Jane Doe'}
+    assert restarted.stats()['memory_hits'] == 1
+
+
+def test_expired_disk_entry_is_removed(tmp_path):
+    key = ParseCache.key(RESUME, 'parse-resume', '2+1')
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.set(key, {'name': 'Jane Doe'})
+    path = cache._disk_path(key)
+    old = time.time() - 120
+    os.utime(path, (old, old))
+
+    assert make_cache(tmp_path, ttl_seconds=60).get(key) is None
+    assert not path.exists()
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path)
+    key = ParseCache.key(RESUME, 'parse-resume', '2+1')
+
+    def fail(src, dst):
+        raise OSError('disk full')
+    monkeypatch.setattr(parse_cache.os, 'replace', fail)
+    cache.set(key, {'name': 'Jane Doe'})
+
+    assert list(tmp_path.glob('*/*')) == []
+    assert cache.stats()['disk_bytes'] == 0
+    # The memory tier still serves the result
+    assert cache.get(key) == {'name': 'Jane Doe'}
@@ -0,0 +1,98 @@
+import asyncio
+import fcntl
+import os
+import threading
+import time
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import TokenBucketLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, 'time', clock.time)
+    return clock
+
+
+def test_bursts_up_to_the_quota_then_waits(clock):
+    limiter = TokenBucketLimiter(requests_per_minute=3, tokens_per_minute=1000)
+
+    assert [limiter._try_acquire(100) for _ in range(3)] == [0, 0, 0]
+    # The request bucket is empty: one request refills in 20 seconds
+    assert limiter._try_acquire(100) == pytest.approx(20)
+    clock.now += 20
+    assert limiter._try_acquire(100) == 0
+
+
+def test_waits_for_enough_tokens(clock):
+    limiter = TokenBucketLimiter(requests_per_minute=100, tokens_per_minute=600)
+
+    assert limiter._try_acquire(500) == 0
+    assert limiter._try_acquire(400) == pytest.approx(30)
+
+
+def test_call_larger_than_the_bucket_still_runs(clock):
+    limiter = TokenBucketLimiter(requests_per_minute=100, tokens_per_minute=600)
+
+    assert limiter._try_acquire(5000) == 0
+    assert limiter._try_acquire(1) > 0
+    clock.now += 60
+    assert limiter._try_acquire(5000) == 0
+
+
+def test_reconcile_refunds_overestimates(clock):
+    limiter = TokenBucketLimiter(requests_per_minute=100, tokens_per_minute=1000)
+
+    assert limiter._try_acquire(1000) == 0
+    limiter.reconcile(1000, 300)
+    assert limiter._try_acquire(700) == 0
+
+
+def test_shared_file_is_one_quota_across_limiters(tmp_path, clock):
+    path = str(tmp_path / 'bucket')
+    first = TokenBucketLimiter(requests_per_minute=2, tokens_per_minute=1000, shared_file=path)
+    second = TokenBucketLimiter(requests_per_minute=2, tokens_per_minute=1000, shared_file=path)
+
+    assert first._try_acquire(10) == 0
+    assert second._try_acquire(10) == 0
+    assert first._try_acquire(10) > 0
+
+
+def test_acquire_waits_for_the_file_lock_off_the_event_loop(tmp_path):
+    path = str(tmp_path / 'bucket')
+    limiter = TokenBucketLimiter(requests_per_minute=10, tokens_per_minute=1000, shared_file=path)
+    # Another process holding the lock, as seen from this one
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    threading.Timer(0.3, fcntl.flock, (fd, fcntl.LOCK_UN)).start()
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        started = time.perf_counter()
+        await limiter.acquire(10)
+        ticker.cancel()
+        return ticks, time.perf_counter() - started
+
+    ticks, elapsed = asyncio.run(main())
+    os.close(fd)
+    assert elapsed >= 0.25
+    assert ticks >= 10
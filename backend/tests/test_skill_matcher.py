@@ -0,0 +1,92 @@
+import json
+import re
+
+import pytest
+
+from services.skill_matcher import DEFAULT_SKILLS_FILE, SkillMatcher, _BOUNDARY, _normalize
+
+SKILLS = {
+    'c': [],
+    'c++': ['cpp'],
+    'c#': ['csharp'],
+    '.net': ['dotnet'],
+    'asp.net': ['asp.net core'],
+    'node': ['node.js', 'nodejs'],
+    'java': [],
+    'javascript': ['js'],
+    'machine learning': ['ml'],
+    'learning': [],
+    'ai': ['artificial intelligence'],
+    'ci/cd': [],
+    'data science': [],
+    'science': [],
+}
+
+TEXTS = [
+    'Built APIs in C++, C# and C on .NET 6 and ASP.NET Core.',
+    'Moved a Java service to JavaScript (Node.js) and later to nodejs 20.',
+    'Machine   learning and\nmachine\tlearning; ML, learning paths.',
+    'Maintained CI/CD pipelines; ci/cd-ready; artificial intelligence and AI.',
+    'javascripts, c+++, c##, x.net, .networking, asp.netcore, Data Science, science fair',
+    'Skills: c++/c#/.net, node.js/js, ml|ai',
+    '',
+]
+
+
+class PerSkillMatcher:
+    """The matching SkillMatcher replaced: one boundary-aware regex per term.
+
+    At each position the longest term that matches wins and scanning
+    continues after it, which is what one alternation of every term,
+    longest first, would do.
+    """
+
+    def __init__(self, skills):
+        self.aliases = {}
+        for canonical, aliases in skills.items():
+            for term in [canonical] + aliases:
+                self.aliases[_normalize(term)] = _normalize(canonical)
+        self.patterns = [
+            re.compile(
+                rf'(?<![{_BOUNDARY}])' + r'\s+'.join(map(re.escape, term.split(' '))) + rf'(?![{_BOUNDARY}])',
+                re.IGNORECASE,
+            )
+            for term in self.aliases
+        ]
+
+    def find_all(self, text):
+        found = {}
+        pos = 0
+        while pos < len(text):
+            matches = [m for m in (p.match(text, pos) for p in self.patterns) if m]
+            if not matches:
+                pos += 1
+                continue
+            longest = max(matches, key=lambda m: m.end())
+            found.setdefault(self.aliases[_normalize(longest.group(0))], None)
+            pos = longest.end()
+        return list(found)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_trie_regex_matches_per_skill_regexes(text):
+    assert SkillMatcher(SKILLS).find_all(text) == PerSkillMatcher(SKILLS).find_all(text)
+
+
+def test_default_dictionary_matches_per_skill_regexes():
+    with open(DEFAULT_SKILLS_FILE, encoding='utf-8') as f:
+        skills = json.load(f)
+    matcher, reference = SkillMatcher(skills), PerSkillMatcher(skills)
+
+    for text in TEXTS:
+        assert matcher.find_all(text) == reference.find_all(text)
+
+
+def test_punctuated_and_overlapping_skills():
+    matcher = SkillMatcher(SKILLS)
+
+    assert matcher.find_all('C++, C# and C') == ['c++', 'c#', 'c']
+    assert matcher.find_all('ASP.NET Core on .NET') == ['asp.net', '.net']
+    assert matcher.find_all('machine learning') == ['machine learning']
+    assert matcher.find_all('javascripts and x.net') == []
+    assert matcher.find_all('maintained') == []
@@ -0,0 +1,68 @@
+import gzip
+import os
+
+import brotli
+import pytest
+
+from storage import IDENTITY, PortfolioStorage
+
+PAGE = '<!DOCTYPE html><html><body>Ada</body></html>'
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return PortfolioStorage(str(tmp_path / 'portfolios'))
+
+
+@pytest.mark.parametrize('slug', ['ada-lovelace-1a2b3c4d', 'portfolio-1a2b3c4d', '-1a2b3c4d'])
+def test_generated_slugs_are_accepted(storage, slug):
+    storage.save_portfolio(slug, {'html_content': PAGE})
+
+    assert storage.get_portfolio(slug) == PAGE
+
+
+@pytest.mark.parametrize('slug', ['', '../etc/passwd', 'Ada', 'ada.html', 'ada/lovelace', 'ada lovelace'])
+def test_other_slugs_are_rejected(storage, slug):
+    with pytest.raises(ValueError):
+        storage.save_portfolio(slug, {'html_content': PAGE})
+    assert storage.get_stored(slug) is None
+
+
+def test_pages_are_sharded_by_slug_prefix(storage):
+    storage.save_portfolio('ada-1a2b3c4d', {'html_content': PAGE})
+
+    entry = storage.get_stored('ada-1a2b3c4d')
+    assert entry.files[IDENTITY] == storage.storage_dir / 'ad' / 'ada-1a2b3c4d.html'
+    assert gzip.decompress(entry.files['gzip'].read_bytes()).decode() == PAGE
+    assert brotli.decompress(entry.files['br'].read_bytes()).decode() == PAGE
+
+
+def test_unsharded_pages_are_still_served(storage):
+    (storage.storage_dir / 'old-1a2b3c4d.html').write_text(PAGE)
+
+    assert storage.get_portfolio('old-1a2b3c4d') == PAGE
+
+
+def test_redeploy_replaces_page_and_variants(storage):
+    storage.save_portfolio('ada-1a2b3c4d', {'html_content': PAGE})
+    storage.save_portfolio('ada-1a2b3c4d', {'html_content': PAGE.replace('Ada', 'Grace')})
+
+    shard = storage.storage_dir / 'ad'
+    assert storage.get_portfolio('ada-1a2b3c4d') == PAGE.replace('Ada', 'Grace')
+    assert len(list(shard.glob('*.gz'))) == 1
+    assert len(list(shard.glob('*.br'))) == 1
+
+
+def test_failed_write_keeps_the_old_page_and_no_temp_file(storage, monkeypatch):
+    storage.save_portfolio('ada-1a2b3c4d', {'html_content': PAGE})
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        storage.save_portfolio('ada-1a2b3c4d', {'html_content': PAGE.replace('Ada', 'Grace')})
+    monkeypatch.undo()
+
+    shard = storage.storage_dir / 'ad'
+    assert (shard / 'ada-1a2b3c4d.html').read_text() == PAGE
+    assert not list(shard.glob('*.tmp'))
@@ -110,9 +110,24 @@ const DeployedUrlContainer = styled.div`
   }
 `;
 
+// Swap re-rendered sections into the page by their data-section id.
+// Returns null if a section is missing, e.g. after manual HTML edits.
+const applySectionFragments = (html, fragments) => {
+  const doc = new DOMParser().parseFromString(html, 'text/html');
+  for (const { id, html: fragmentHtml } of fragments) {
+    const target = doc.querySelector(`[data-section="${id}"]`);
+    if (!target) return null;
+    const template = doc.createElement('template');
+    template.innerHTML = fragmentHtml.trim();
+    target.replaceWith(template.content);
+  }
+  return '<!DOCTYPE html>\n' + doc.documentElement.outerHTML;
+};
+
 function App() {
   const [userInfo, setUserInfo] = useState(null);
   const [generatedHtml, setGeneratedHtml] = useState('');
+  const [sectionDigests, setSectionDigests] = useState(null);
   const [activeTab, setActiveTab] = useState('preview');
   const [isGenerating, setIsGenerating] = useState(false);
   const [deployedUrl, setDeployedUrl] = useState(null);
@@ -134,6 +149,7 @@ function App() {
 
       const data = await response.json();
       setGeneratedHtml(data.html);
+      setSectionDigests(data.sections);
       setUserInfo(formData);
       setActiveTab('preview');
     } catch (error) {
@@ -153,20 +169,31 @@ function App() {
         projects
       };
 
-      const response = await fetch('http://localhost:8000/generate-portfolio', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(updatedUserInfo),
-      });
+      const render = async (knownSections) => {
+        const response = await fetch('http://localhost:8000/generate-portfolio', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ ...updatedUserInfo, known_sections: knownSections }),
+        });
 
-      if (!response.ok) {
-        throw new Error('Failed to update portfolio');
-      }
+        if (!response.ok) {
+          throw new Error('Failed to update portfolio');
+        }
+        return response.json();
+      };
 
-      const data = await response.json();
-      setGeneratedHtml(data.html);
+      // Ask only for the sections that changed, falling back to a full render
+      let data = sectionDigests ? await render(sectionDigests) : null;
+      const patchedHtml = data && applySectionFragments(generatedHtml, data.fragments);
+      if (patchedHtml) {
+        setGeneratedHtml(patchedHtml);
+      } else {
+        data = await render(null);
+        setGeneratedHtml(data.html);
+      }
+      setSectionDigests(data.sections);
       setUserInfo(updatedUserInfo);
     } catch (error) {
       console.error('Error:', error);